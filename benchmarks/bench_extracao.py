@@ -0,0 +1,91 @@
+# benchmarks/bench_extracao.py
+"""Compara os motores de extração do boletim (camelot x pdfplumber) no PDF do repositório.
+
+Cada motor roda em um processo novo, para que o pico de memória (ru_maxrss) e o
+tempo de importação das bibliotecas de um não contaminem o outro.
+
+Uso:
+    python -m benchmarks.bench_extracao [--repeticoes 3] [--json saida.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_PADRAO = os.path.join(BASE_DIR, "src", "boletim_fortaleza.pdf")
+ENGINES = ("camelot", "pdfplumber")
+
+
+def medir_no_processo(engine, arquivo_pdf, repeticoes):
+    """Executado no processo filho: importa o scraper, processa o PDF e devolve as medidas."""
+    inicio = time.perf_counter()
+    from src.scraper import parse_pdf
+    importacao_s = time.perf_counter() - inicio
+
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = parse_pdf(arquivo_pdf, engine)
+        tempos.append(time.perf_counter() - inicio)
+
+    return {
+        "engine": engine,
+        "importacao_s": round(importacao_s, 4),
+        "parse_primeiro_s": round(tempos[0], 4),
+        "parse_min_s": round(min(tempos), 4),
+        # ru_maxrss é em KiB no Linux
+        "pico_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "linhas": resultado["linhas"],
+    }
+
+
+def medir(engine, arquivo_pdf=PDF_PADRAO, repeticoes=3):
+    """Roda um motor em um processo Python novo e devolve as medidas."""
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_extracao", "--interno", engine,
+         "--pdf", arquivo_pdf, "--repeticoes", str(repeticoes)],
+        cwd=BASE_DIR, check=True, capture_output=True, text=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def comparar(arquivo_pdf=PDF_PADRAO, repeticoes=3):
+    resultados = {engine: medir(engine, arquivo_pdf, repeticoes) for engine in ENGINES}
+    linhas = [resultados[e].pop("linhas") for e in ENGINES]
+    return {
+        "pdf": os.path.relpath(arquivo_pdf, BASE_DIR),
+        "paridade": linhas[0] == linhas[1],
+        "linhas": len(linhas[0]),
+        "engines": resultados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", default=PDF_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    parser.add_argument("--interno", choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(medir_no_processo(args.interno, args.pdf, args.repeticoes), ensure_ascii=False))
+        return
+
+    relatorio = comparar(args.pdf, args.repeticoes)
+    print(f"PDF: {relatorio['pdf']} | linhas: {relatorio['linhas']} | paridade: {relatorio['paridade']}")
+    print(f"{'motor':<12}{'import (s)':>12}{'1º parse (s)':>14}{'parse min (s)':>15}{'pico RSS (MB)':>15}")
+    for engine, r in relatorio["engines"].items():
+        print(f"{engine:<12}{r['importacao_s']:>12}{r['parse_primeiro_s']:>14}{r['parse_min_s']:>15}{r['pico_rss_mb']:>15}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# benchmarks/run.py
+"""Benchmark reprodutível e offline das rotas da API e da ingestão do boletim.
+
+Sobe um stub local da Open-Meteo (com latência configurável), inicia a API em
+um processo separado apontando para o stub, dispara requisições concorrentes em
+cada rota e mede p50/p95/p99 e vazão. Também cronometra as etapas do scraper
+sobre o PDF do repositório. O resultado é gravado em JSON para comparação entre
+execuções.
+
+Uso:
+    python -m benchmarks.run [--requisicoes 200] [--concorrencia 8] [--latencia 0.05]
+                             [--sem-cache] [--servidor gunicorn] [--comparar anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+import requests
+
+from .stub_open_meteo import StubOpenMeteo
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS_DIR = os.path.join(BASE_DIR, "benchmarks", "resultados")
+
+
+def rotas(data):
+    return {
+        "praias": "/praias",
+        "praia_por_id_e_data": f"/praias/1/data?data={data}&hora=12:00",
+        "zona_com_data": f"/praias/zona/leste?data={data}",
+        "status_com_data": f"/praias/status/propria?data={data}",
+    }
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+
+class ServidorAPI:
+    """Executa a API em um processo separado (werkzeug com threads ou gunicorn)."""
+
+    def __init__(self, stub, tipo="werkzeug", workers=2, threads=8, sem_cache=False):
+        self.porta = porta_livre()
+        self.url = f"http://127.0.0.1:{self.porta}"
+        self.env = dict(
+            os.environ,
+            OPEN_METEO_WEATHER_URL=stub.url_weather,
+            OPEN_METEO_MARINE_URL=stub.url_marine,
+            SCRAPER_ATUALIZACAO_AUTOMATICA="0",
+            HISTORICO_DB=os.path.join(tempfile.mkdtemp(), "historico.sqlite3"),
+            # o stub não tem cota: o balde só não pode limitar a carga medida
+            OPEN_METEO_BUCKET_FILE=os.path.join(tempfile.mkdtemp(), "open_meteo.bucket"),
+            OPEN_METEO_TAXA="100000",
+            OPEN_METEO_RAJADA="100000",
+        )
+        if sem_cache:
+            self.env["FORECAST_CACHE_MAX"] = "0"
+            self.env["FORECAST_PREFETCH"] = "0"
+        if tipo == "gunicorn":
+            self.comando = [sys.executable, "-m", "gunicorn", "src.app:app", "-b", f"127.0.0.1:{self.porta}",
+                            "--workers", str(workers), "--threads", str(threads), "--preload", "--log-level", "warning"]
+        else:
+            self.comando = [sys.executable, "-m", "flask", "--app", "src.app:app", "run",
+                            "--port", str(self.porta), "--with-threads", "--no-reload"]
+        self.processo = None
+
+    def __enter__(self):
+        self.processo = subprocess.Popen(self.comando, cwd=BASE_DIR, env=self.env,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        limite = time.monotonic() + 60
+        while time.monotonic() < limite:
+            try:
+                if requests.get(self.url + "/", timeout=1).status_code == 200:
+                    return self
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("A API não respondeu a tempo.")
+
+    def __exit__(self, *exc):
+        if self.processo:
+            self.processo.terminate()
+            self.processo.wait(timeout=10)
+
+
+def carga(url, requisicoes, concorrencia, aquecimento=5):
+    """Dispara `requisicoes` GETs em `concorrencia` threads e devolve as estatísticas de latência (ms)."""
+    with requests.Session() as s:
+        for _ in range(aquecimento):
+            s.get(url)
+
+    latencias = []
+    erros = 0
+    restantes = [requisicoes]
+    lock = threading.Lock()
+
+    def trabalhador():
+        nonlocal erros
+        with requests.Session() as s:
+            while True:
+                with lock:
+                    if restantes[0] <= 0:
+                        return
+                    restantes[0] -= 1
+                inicio = time.perf_counter()
+                try:
+                    ok = s.get(url, timeout=30).status_code < 500
+                except requests.exceptions.RequestException:
+                    ok = False
+                duracao = (time.perf_counter() - inicio) * 1000
+                with lock:
+                    latencias.append(duracao)
+                    erros += not ok
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhador) for _ in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total_s = time.perf_counter() - inicio
+
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "media_ms": round(statistics.fmean(latencias), 2),
+        "vazao_rps": round(len(latencias) / total_s, 1),
+    }
+
+
+def medir_ingestao(engine, repeticoes=3):
+    """Cronometra as etapas do scraper (sem rede) sobre o PDF do repositório, em segundos.
+
+    Usa as mesmas funções e os mesmos nomes de etapa de run_scraper (medir_etapa),
+    sem o cache de extração.
+    """
+    from src import scraper
+
+    execucoes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeticoes):
+            etapas = {}
+            parsed = scraper.parse_pdf(scraper.ARQUIVO_PDF, engine, etapas=etapas)
+            with scraper.medir_etapa(etapas, "montar_dataframe"):
+                df = scraper.montar_dataframe(parsed)
+            with scraper.medir_etapa(etapas, "salvar_csv"):
+                scraper.salvar_csv(df, os.path.join(tmp, "boletim.csv"))
+            execucoes.append(etapas)
+
+    return {etapa: {"primeira_s": round(execucoes[0][etapa], 4), "min_s": round(min(e[etapa] for e in execucoes), 4)}
+            for etapa in execucoes[0]}
+
+
+def comparar(atual, anterior):
+    print(f"\nComparação com {anterior['meta']['gerado_em']}:")
+    for nome, r in atual["rotas"].items():
+        a = anterior.get("rotas", {}).get(nome)
+        if not a:
+            continue
+        deltas = [f"{m} {a[m]} -> {r[m]} ({(r[m] - a[m]) / a[m] * 100:+.1f}%)" for m in ("p50_ms", "p95_ms", "vazao_rps") if a[m]]
+        print(f"  {nome:<22}" + " | ".join(deltas))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por rota")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência do stub da Open-Meteo, em segundos")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--sem-cache", action="store_true", help="desliga o cache de previsões da API")
+    parser.add_argument("--servidor", choices=("werkzeug", "gunicorn"), default="werkzeug")
+    parser.add_argument("--workers", type=int, default=2, help="workers do gunicorn")
+    parser.add_argument("--threads", type=int, default=8, help="threads por worker do gunicorn")
+    parser.add_argument("--rotas", nargs="*", help="subconjunto das rotas a medir")
+    parser.add_argument("--sem-ingestao", action="store_true", help="não mede as etapas do scraper")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: benchmarks/resultados/<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    hoje = date.today().isoformat()
+    resultado = {
+        "meta": {
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "parametros": vars(args),
+        },
+        "rotas": {},
+    }
+
+    with StubOpenMeteo(args.latencia, args.jitter) as stub:
+        with ServidorAPI(stub, args.servidor, args.workers, args.threads, args.sem_cache) as api:
+            for nome, caminho in rotas(hoje).items():
+                if args.rotas and nome not in args.rotas:
+                    continue
+                resultado["rotas"][nome] = carga(api.url + caminho, args.requisicoes, args.concorrencia)
+                r = resultado["rotas"][nome]
+                print(f"{nome:<22} p50 {r['p50_ms']:>8} ms | p95 {r['p95_ms']:>8} ms | p99 {r['p99_ms']:>8} ms | "
+                      f"{r['vazao_rps']:>7} req/s | erros {r['erros']}")
+        resultado["chamadas_open_meteo"] = dict(stub.chamadas)
+
+    if not args.sem_ingestao:
+        resultado["ingestao"] = {}
+        for engine in ("camelot", "pdfplumber"):
+            try:
+                etapas = medir_ingestao(engine)
+            except ImportError as e:
+                # Motores opcionais (o camelot é importado sob demanda): fica registrado no resultado
+                resultado["ingestao"][engine] = {"indisponivel": str(e)}
+                print(f"ingestão ({engine}): indisponível ({e})")
+                continue
+            resultado["ingestao"][engine] = etapas
+            print(f"ingestão ({engine}): " + " | ".join(f"{e} {t['min_s']} s" for e, t in etapas.items()))
+
+    saida = args.saida or os.path.join(RESULTADOS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=4)
+    print(f"Resultado salvo em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# benchmarks/stub_open_meteo.py
+"""Stub local da Open-Meteo (previsão do tempo e marinha) com latência configurável.
+
+Responde /v1/forecast e /v1/marine no mesmo formato da API real, inclusive listas
+de latitudes/longitudes separadas por vírgula (uma resposta por ponto) e
+intervalos start_date..end_date (24 valores por dia). Os valores são
+determinísticos, derivados da coordenada e da hora. Também injeta falhas
+(respostas de erro ou lentidão) para testar a proteção da API contra
+incidentes da Open-Meteo.
+
+Uso:
+    python -m benchmarks.stub_open_meteo --porta 8081 --latencia 0.1 [--taxa-falha 0.5 --status-falha 503]
+    OPEN_METEO_WEATHER_URL=http://127.0.0.1:8081/v1/forecast \\
+    OPEN_METEO_MARINE_URL=http://127.0.0.1:8081/v1/marine gunicorn src.app:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Resolução da grade de cada modelo: cada ponto é respondido pelo nó mais próximo,
+# informado em latitude/longitude como na API real
+GRADES = {"/v1/forecast": 0.1, "/v1/marine": 0.083}
+
+VARIAVEIS = {
+    "/v1/forecast": ["temperature_2m", "apparent_temperature", "windspeed_10m", "winddirection_10m", "precipitation", "cloudcover"],
+    "/v1/marine": ["wave_height", "wave_direction", "wave_period"],
+}
+
+
+def no_da_grade(valor, resolucao):
+    return round(round(valor / resolucao) * resolucao, 4)
+
+
+def serie_horaria(variaveis, lat, lon, inicio, fim):
+    dias = (fim - inicio).days + 1
+    horas = [f"{inicio + timedelta(days=d)}T{h:02d}:00" for d in range(dias) for h in range(24)]
+    base = abs(lat * 10) + abs(lon)
+    hourly = {"time": horas}
+    for i, var in enumerate(variaveis):
+        hourly[var] = [round(base % 10 + i + (h % 24) / 10, 2) for h in range(len(horas))]
+    return hourly
+
+
+class StubOpenMeteo:
+    """Servidor HTTP em thread que imita a Open-Meteo.
+
+    `latencia_s` é o atraso fixo por requisição e `jitter_s` um atraso extra
+    aleatório (uniforme entre 0 e jitter_s). `chamadas` conta as requisições por caminho.
+
+    Injeção de falhas (pode ser alterada com o stub rodando): uma fração
+    `taxa_falha` das requisições recebe `status_falha` depois de `atraso_falha_s`
+    segundos; `caminhos_falha` restringe as falhas a alguns caminhos (todos, se None).
+    """
+
+    def __init__(self, latencia_s=0.05, jitter_s=0.0, host="127.0.0.1", porta=0,
+                 taxa_falha=0.0, status_falha=503, atraso_falha_s=0.0, caminhos_falha=None):
+        self.latencia_s = latencia_s
+        self.jitter_s = jitter_s
+        self.taxa_falha = taxa_falha
+        self.status_falha = status_falha
+        self.atraso_falha_s = atraso_falha_s
+        self.caminhos_falha = caminhos_falha
+        self.chamadas = {caminho: 0 for caminho in VARIAVEIS}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer((host, porta), Handler)
+        self.servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url_base(self):
+        host, porta = self.servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    @property
+    def url_weather(self):
+        return f"{self.url_base}/v1/forecast"
+
+    @property
+    def url_marine(self):
+        return f"{self.url_base}/v1/marine"
+
+    def _responder(self, handler):
+        url = urlparse(handler.path)
+        if url.path not in VARIAVEIS:
+            return self._enviar(handler, 404, {"error": True, "reason": "not found"})
+        with self._lock:
+            self.chamadas[url.path] += 1
+        time.sleep(self.latencia_s + (random.uniform(0, self.jitter_s) if self.jitter_s else 0))
+        if self._deve_falhar(url.path):
+            time.sleep(self.atraso_falha_s)
+            return self._enviar(handler, self.status_falha, {"error": True, "reason": "falha injetada"})
+
+        params = parse_qs(url.query)
+        try:
+            lats = [float(x) for x in params["latitude"][0].split(",")]
+            lons = [float(x) for x in params["longitude"][0].split(",")]
+            inicio = date.fromisoformat(params["start_date"][0])
+            fim = date.fromisoformat(params["end_date"][0])
+        except (KeyError, ValueError):
+            return self._enviar(handler, 400, {"error": True, "reason": "parâmetros inválidos"})
+
+        locais = []
+        for lat, lon in zip(lats, lons):
+            lat, lon = no_da_grade(lat, GRADES[url.path]), no_da_grade(lon, GRADES[url.path])
+            locais.append({"latitude": lat, "longitude": lon, "hourly": serie_horaria(VARIAVEIS[url.path], lat, lon, inicio, fim)})
+        self._enviar(handler, 200, locais if len(locais) > 1 else locais[0])
+
+    def _deve_falhar(self, caminho):
+        if self.caminhos_falha is not None and caminho not in self.caminhos_falha:
+            return False
+        return self.taxa_falha >= 1 or (self.taxa_falha > 0 and random.random() < self.taxa_falha)
+
+    def _enviar(self, handler, status, payload):
+        corpo = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(corpo)))
+        handler.end_headers()
+        handler.wfile.write(corpo)
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, name="stub-open-meteo", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8081)
+    parser.add_argument("--latencia", type=float, default=0.05, help="atraso fixo por requisição, em segundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="atraso extra aleatório máximo, em segundos")
+    parser.add_argument("--taxa-falha", type=float, default=0.0, help="fração das requisições que falham (0 a 1)")
+    parser.add_argument("--status-falha", type=int, default=503, help="status HTTP das falhas injetadas")
+    parser.add_argument("--atraso-falha", type=float, default=0.0, help="atraso extra das falhas, em segundos")
+    args = parser.parse_args()
+
+    stub = StubOpenMeteo(args.latencia, args.jitter, args.host, args.porta,
+                         args.taxa_falha, args.status_falha, args.atraso_falha)
+    print(f"Stub da Open-Meteo em {stub.url_weather} e {stub.url_marine}")
+    try:
+        stub.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
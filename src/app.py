@@ -1,16 +1,20 @@
 # src/app.py
 
-from flask import Flask, Response, request
+from flask import Flask, Response, g, request, stream_with_context
 from flasgger import Swagger
-import json
 from datetime import datetime
-import pandas as pd
-import os
-import requests
+import time
 
 # Importações relativas para funcionar no ambiente de produção
-from .scraper import run_scraper
-from .coordenadas import COORDENADAS_POR_CODIGO
+from .ingestao import executar_scraper
+from .forecast import cache as cache_previsoes, get_forecast, get_forecast_range, get_forecasts, get_forecasts_lote, iter_forecasts
+from .dataset import Dataset
+from .historico import historico
+from .store import extrair_codigo, parse_data
+from .respostas import CacheRespostas, ndjson_response, quer_ndjson, quer_pretty, serializar
+from .refresher import Atualizador, ATIVO as ATUALIZACAO_ATIVA
+from .prefetch import Prefetcher, ATIVO as PREFETCH_ATIVO
+from . import metrics
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
@@ -29,71 +33,142 @@ template = {
 }
 swagger = Swagger(app, template=template)
 
-# --- Executa o scraper na inicialização da API ---
-try:
-    print("Executando scraper para atualizar boletim...")
-    run_scraper()
-except Exception as e:
-    print(f"AVISO: O scraper falhou com o erro: {e}")
-    print("A API continuará usando o arquivo CSV existente, se disponível.")
+# --- Dados das praias e atualização do boletim em segundo plano ---
+# A API começa a servir imediatamente a partir do último CSV válido; o scraper
+# roda em um subprocesso disparado por uma thread de fundo (uma execução por vez
+# entre todos os workers, sem carregar pandas/camelot no worker) e o boletim novo
+# é percebido por cada worker sem reiniciar.
+dataset = Dataset()
 
-# --- Função de resposta JSON ---
+def atualizar_boletim():
+    try:
+        relatorio = executar_scraper()
+    except Exception:
+        metrics.registrar_scraper(None)
+        raise
+    metrics.registrar_scraper(relatorio)
+
+atualizador = Atualizador(atualizar_boletim)
+
+# Previsões de todos os pontos para os próximos dias mantidas aquecidas em
+# segundo plano (stale-while-revalidate): as rotas não esperam a Open-Meteo
+prefetcher = Prefetcher()
+
+@app.before_request
+def iniciar_requisicao():
+    g.inicio = time.perf_counter()
+    if ATUALIZACAO_ATIVA:
+        atualizador.garantir_iniciado()
+    if PREFETCH_ATIVO:
+        prefetcher.garantir_iniciado()
+
+# --- Funções de resposta JSON ---
+# JSON compacto por padrão; ?pretty=1 devolve a saída indentada
 def json_response(data, status=200):
-    return Response(json.dumps(data, ensure_ascii=False, indent=4), status=status, mimetype="application/json")
+    return Response(serializar(data, quer_pretty(request)), status=status, mimetype="application/json")
+
+# Rotas cujo conteúdo só muda com o boletim: corpo renderizado uma vez por versão
+# dos dados, com ETag (If-None-Match -> 304), Cache-Control e gzip/br
+respostas = CacheRespostas()
+
+def resposta_estatica(store, chave, gerar):
+    # O próprio store identifica a versão dos dados (um objeto novo a cada carga)
+    return respostas.responder(request, store, chave, gerar)
+
+# --- Métricas (expostas em /metrics) ---
+@app.after_request
+def registrar_metricas(response):
+    inicio = g.pop("inicio", None)
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule else "nao_encontrada"
+        labels = (rota, request.method, str(response.status_code))
+        metrics.http_requisicoes.inc(*labels)
+        metrics.http_latencia.observe(time.perf_counter() - inicio, *labels)
+    return response
 
-# --- Carregamento dos dados do CSV ---
-SRC_DIR = os.path.dirname(os.path.abspath(__file__))
-BASE_DIR = os.path.dirname(SRC_DIR)
-CSV_FILE = os.path.join(BASE_DIR, "boletim_fortaleza.csv")
+def idade_boletim():
+    periodo = dataset.atual().periodo_boletim()
+    if not periodo:
+        return None
+    return time.time() - datetime.combine(periodo[0], datetime.min.time()).timestamp()
 
-try:
-    df = pd.read_csv(CSV_FILE)
-except FileNotFoundError:
-    df = pd.DataFrame() # Inicia com um DataFrame vazio se o arquivo não existir
-    print(f"AVISO: O arquivo {CSV_FILE} não foi encontrado. A API iniciará com dados vazios.")
+def estatisticas_cache(cache, campo):
+    return lambda: cache.stats()[campo]
 
-praias = df.to_dict(orient="records")
+metrics.registro.gauge("api_boletim_idade_segundos", "Tempo desde o início do período do boletim carregado.", funcao=idade_boletim)
+metrics.registro.counter("api_cache_previsao_stale_hits_total", "Acertos do cache de previsao servidos vencidos (revalidados em segundo plano).",
+                         funcao=estatisticas_cache(cache_previsoes, "stale_hits"))
+for nome_cache, cache in (("previsao", cache_previsoes), ("respostas", respostas)):
+    metrics.registro.counter(f"api_cache_{nome_cache}_hits_total", f"Acertos acumulados do cache de {nome_cache}.", funcao=estatisticas_cache(cache, "hits"))
+    metrics.registro.counter(f"api_cache_{nome_cache}_misses_total", f"Falhas acumuladas do cache de {nome_cache}.", funcao=estatisticas_cache(cache, "misses"))
+    metrics.registro.gauge(f"api_cache_{nome_cache}_hit_ratio", f"Taxa de acertos do cache de {nome_cache}.", funcao=estatisticas_cache(cache, "hit_ratio"))
 
 # --- Funções auxiliares ---
-def get_forecast(lat, lon, data, hora=None):
-    hora_consulta = hora if hora else "12:00"
-    weather_url = (f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,apparent_temperature,windspeed_10m,winddirection_10m,precipitation,cloudcover&start_date={data}&end_date={data}&timezone=America/Fortaleza")
-    marine_url = (f"https://marine-api.open-meteo.com/v1/marine?latitude={lat}&longitude={lon}&hourly=wave_height,wave_direction,wave_period&start_date={data}&end_date={data}&timezone=America/Fortaleza")
-    
-    forecast = {"mensagem": f"Previsão não disponível para {data} às {hora_consulta}", "data": data, "hora_consulta": hora_consulta}
-    try:
-        weather_response = requests.get(weather_url)
-        marine_response = requests.get(marine_url)
-        weather_data = weather_response.json() if weather_response.status_code == 200 else {}
-        marine_data = marine_response.json() if marine_response.status_code == 200 else {}
-        
-        target_time = f"{data}T{hora_consulta}"
-        
-        if "hourly" in weather_data and target_time in weather_data["hourly"]["time"]:
-            idx = weather_data["hourly"]["time"].index(target_time)
-            forecast.update({
-                "temperatura_c": weather_data["hourly"]["temperature_2m"][idx],
-                "sensacao_termica_c": weather_data["hourly"]["apparent_temperature"][idx],
-                "velocidade_vento_kmh": weather_data["hourly"]["windspeed_10m"][idx],
-                "direcao_vento_graus": weather_data["hourly"]["winddirection_10m"][idx],
-                "chuva_mm": weather_data["hourly"]["precipitation"][idx],
-                "cobertura_nuvens_pct": weather_data["hourly"]["cloudcover"][idx],
-                "mensagem": "Previsão obtida com sucesso"
-            })
-        if "hourly" in marine_data and target_time in marine_data["hourly"]["time"]:
-            idx = marine_data["hourly"]["time"].index(target_time)
-            forecast.update({
-                "altura_ondas_m": marine_data["hourly"]["wave_height"][idx],
-                "direcao_ondas_graus": marine_data["hourly"]["wave_direction"][idx],
-                "periodo_ondas_s": marine_data["hourly"]["wave_period"][idx],
-            })
-    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
-        print(f"Erro ao obter previsão: {e}")
-
-    return forecast
-
-def extrair_codigo(praia):
-    return (praia.get("Nome", "")[:3] or "").strip().upper()
+def anexar_previsoes(store, resultado, data, hora):
+    """Junta cada praia à sua previsão, buscando todos os pontos em lote na Open-Meteo."""
+    previsoes = get_forecasts([c for c in map(store.coordenadas, resultado) if c], data, hora)
+    resposta_com_previsao = []
+    for praia in resultado:
+        coords = store.coordenadas(praia)
+        previsao = previsoes[coords] if coords else {"mensagem": "Coordenadas não disponíveis"}
+        resposta_com_previsao.append({"praia": praia, "previsao": previsao})
+    return resposta_com_previsao
+
+def anexar_previsoes_stream(store, resultado, data, hora):
+    """Como anexar_previsoes, mas gera cada praia assim que a previsão do seu ponto fica pronta."""
+    por_ponto = {}
+    for praia in resultado:
+        coords = store.coordenadas(praia)
+        if coords:
+            por_ponto.setdefault(coords, []).append(praia)
+        else:
+            yield {"praia": praia, "previsao": {"mensagem": "Coordenadas não disponíveis"}}
+    for ponto, previsao in iter_forecasts(list(por_ponto), data, hora):
+        for praia in por_ponto[ponto]:
+            yield {"praia": praia, "previsao": previsao}
+
+def responder_com_previsoes(store, resultado, data, hora):
+    # NDJSON (?stream=1 ou Accept: application/x-ndjson): uma praia por linha, sem montar a lista inteira
+    if quer_ndjson(request):
+        return ndjson_response(stream_with_context(anexar_previsoes_stream(store, resultado, data, hora)))
+    return json_response(anexar_previsoes(store, resultado, data, hora))
+
+def normalizar_data(data):
+    """Data YYYY-MM-DD com zeros (2026-01-05), como nas chaves do cache e da Open-Meteo, ou None se inválida."""
+    dia = parse_data(data)
+    return dia.isoformat() if dia else None
+
+MENSAGEM_DATA_INVALIDA = "É necessário informar a data no formato YYYY-MM-DD"
+
+def boletim_vigente(store, praia, data):
+    """Boletim da praia em vigor na data: o carregado, se cobrir a data, ou o do histórico."""
+    if store.cobre_data(praia, data):
+        return praia
+    return historico.boletim_vigente(extrair_codigo(praia), data)
+
+# Horizonte máximo de previsão da Open-Meteo, em dias
+MAX_DIAS_INTERVALO = 16
+
+def parse_horas(horas, passo):
+    """Conjunto de horas "HH:MM" pedidas (lista separada por vírgula ou passo em horas), None para todas.
+
+    Levanta ValueError se os parâmetros forem inválidos. As séries da Open-Meteo são
+    horárias, então horas com minutos diferentes de :00 também são recusadas.
+    """
+    if horas:
+        selecionadas = set()
+        for texto in horas.split(","):
+            instante = datetime.strptime(texto.strip(), "%H:%M")
+            if instante.minute:
+                raise ValueError(texto)
+            selecionadas.add(instante.strftime("%H:%M"))
+        return selecionadas
+    if passo:
+        passo = int(passo)
+        if not 1 <= passo <= 24:
+            raise ValueError(passo)
+        return {f"{h:02d}:00" for h in range(0, 24, passo)}
+    return None
 
 # --- Definição de TODAS as Rotas da API ---
 
@@ -101,52 +176,182 @@ def extrair_codigo(praia):
 def home():
     """Endpoint Raiz da API."""
     data = { "message": "Bem-vindo à API de Balneabilidade de Fortaleza!", "documentacao": "/apidocs" }
-    return json_response(data)
+    return resposta_estatica(dataset.atual(), "home", lambda: data)
 
 @app.route("/praias")
 def listar_praias():
     """Listar todas as praias (Resumo)."""
-    if not praias:
+    store = dataset.atual()
+    if not store:
         return json_response({"message": "Nenhum dado de praias disponível no momento."}, status=404)
-    praias_resumo = [{"id": p.get("id"), "nome": p.get("Nome"), "zona": p.get("Zona")} for p in praias]
-    return json_response(praias_resumo)
+    return resposta_estatica(store, "praias", store.resumo)
+
+# Limites da consulta de praias próximas
+LIMITE_PADRAO_PROXIMAS = 5
+LIMITE_MAXIMO_PROXIMAS = 100
+
+@app.route("/praias/proximas")
+def praias_proximas():
+    """Praias monitoradas mais próximas de uma coordenada, com a distância em km."""
+    store = dataset.atual()
+    try:
+        lat = float(request.args["lat"])
+        lon = float(request.args["lon"])
+        raio = float(request.args["raio"]) if "raio" in request.args else None
+        limite = int(request.args["limite"]) if "limite" in request.args else None
+    except (KeyError, ValueError):
+        return json_response({"message": "Informe lat e lon em graus decimais (raio em km e limite são opcionais)"}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (raio is not None and raio <= 0) \
+            or (limite is not None and not 1 <= limite <= LIMITE_MAXIMO_PROXIMAS):
+        return json_response({"message": f"Coordenadas, raio ou limite (1 a {LIMITE_MAXIMO_PROXIMAS}) inválidos"}, status=400)
+    if raio is None and limite is None:
+        limite = LIMITE_PADRAO_PROXIMAS
+
+    proximas = store.proximas(lat, lon, raio, limite)
+    resposta = [{"praia": praia, "distancia_km": round(distancia, 3)} for praia, distancia in proximas]
+    data = request.args.get("data")
+    if data:
+        data = normalizar_data(data)
+        if not data:
+            return json_response({"message": MENSAGEM_DATA_INVALIDA}, status=400)
+        previsoes = anexar_previsoes(store, [praia for praia, _ in proximas], data, request.args.get("hora", "12:00"))
+        for item, com_previsao in zip(resposta, previsoes):
+            item["previsao"] = com_previsao["previsao"]
+    return json_response(resposta)
 
 @app.route("/praias/<int:id>")
 def buscar_praia_por_id(id):
     """Buscar praia por ID."""
-    praia = next((p for p in praias if p.get("id") == id), None)
+    store = dataset.atual()
+    praia = store.por_id(id)
     if not praia:
         return json_response({"message": f"Nenhuma praia encontrada com id {id}"}, status=404)
-    return json_response(praia)
+    return resposta_estatica(store, ("praia", id), lambda: praia)
     
 @app.route("/praias/<int:id>/data")
 def buscar_praia_por_id_e_data(id):
     """Obter dados de uma praia por ID em uma data específica."""
-    data = request.args.get("data")
+    store = dataset.atual()
+    data = normalizar_data(request.args.get("data"))
     hora = request.args.get("hora", "12:00")
     if not data:
-        return json_response({"message": "É necessário informar a data no formato YYYY-MM-DD"}, status=400)
+        return json_response({"message": MENSAGEM_DATA_INVALIDA}, status=400)
     
-    praia = next((p for p in praias if p.get("id") == id), None)
+    praia = store.por_id(id)
     if not praia:
         return json_response({"message": f"Nenhuma praia encontrada com id {id}"}, status=404)
         
-    codigo = extrair_codigo(praia)
-    if not codigo or codigo not in COORDENADAS_POR_CODIGO:
+    coords = store.coordenadas(praia)
+    if not coords:
         return json_response({"message": "Coordenadas da praia não disponíveis"}, status=500)
-        
-    lat_str, lon_str = COORDENADAS_POR_CODIGO[codigo].split(", ")
-    lat, lon = float(lat_str), float(lon_str)
+    lat, lon = coords
     
     forecast = get_forecast(lat, lon, data, hora)
-    boletim = praia if data in str(praia.get("Dias_Periodo", "")).split(", ") else f"Não há boletim da Semace disponível para {data}"
+    boletim = boletim_vigente(store, praia, data) or f"Não há boletim da Semace disponível para {data}"
     
     resposta = {"boletim": boletim, "previsao": forecast}
     return json_response(resposta)
 
+@app.route("/praias/<int:id>/previsao")
+def previsao_por_intervalo(id):
+    """Séries horárias de previsão de uma praia entre duas datas, com o status do boletim de cada dia."""
+    store = dataset.atual()
+    inicio = request.args.get("inicio")
+    fim = request.args.get("fim", inicio)
+    dia_inicio, dia_fim = parse_data(inicio), parse_data(fim)
+    if not dia_inicio or not dia_fim:
+        return json_response({"message": "É necessário informar inicio (e opcionalmente fim) no formato YYYY-MM-DD"}, status=400)
+    if dia_fim < dia_inicio or (dia_fim - dia_inicio).days >= MAX_DIAS_INTERVALO:
+        return json_response({"message": f"O intervalo deve ter de 1 a {MAX_DIAS_INTERVALO} dias, com fim >= inicio"}, status=400)
+    try:
+        horas = parse_horas(request.args.get("horas"), request.args.get("passo"))
+    except ValueError:
+        return json_response({"message": "Use horas=HH:MM,HH:MM,... ou passo=N (1 a 24 horas)"}, status=400)
+
+    praia = store.por_id(id)
+    if not praia:
+        return json_response({"message": f"Nenhuma praia encontrada com id {id}"}, status=404)
+    coords = store.coordenadas(praia)
+    if not coords:
+        return json_response({"message": "Coordenadas da praia não disponíveis"}, status=500)
+
+    # Datas normalizadas (YYYY-MM-DD com zeros), como nas chaves da Open-Meteo e do cache
+    inicio, fim = dia_inicio.isoformat(), dia_fim.isoformat()
+    series = get_forecast_range(coords[0], coords[1], inicio, fim, horas)
+    # Status do boletim em vigor em cada dia, repetido em cada hora da série
+    status_por_dia = {}
+    for instante in series["tempo"]:
+        dia = instante[:10]
+        if dia not in status_por_dia:
+            boletim = boletim_vigente(store, praia, dia)
+            status_por_dia[dia] = boletim.get("Status") if boletim else None
+    series["status_boletim"] = [status_por_dia[instante[:10]] for instante in series["tempo"]]
+
+    resposta = {
+        "praia": {"id": praia.get("id"), "nome": praia.get("Nome"), "zona": praia.get("Zona")},
+        "inicio": inicio,
+        "fim": fim,
+        "series": series,
+    }
+    return json_response(resposta)
+
+# Número máximo de consultas aceitas em um lote
+MAX_ITENS_LOTE = 200
+
+def validar_item_lote(store, item):
+    """Devolve (praia, coordenadas, data, hora) de um item do lote ou uma mensagem de erro."""
+    if not isinstance(item, dict):
+        return "Cada item deve ser um objeto com id, data e hora"
+    id = item.get("id")
+    if not isinstance(id, int) or isinstance(id, bool):
+        return "O id deve ser um número inteiro"
+    praia = store.por_id(id)
+    if not praia:
+        return f"Nenhuma praia encontrada com id {id}"
+    dia = parse_data(item.get("data"))
+    if dia is None:
+        return MENSAGEM_DATA_INVALIDA
+    try:
+        instante = datetime.strptime(item.get("hora") or "12:00", "%H:%M")
+    except (TypeError, ValueError):
+        return "A hora deve estar no formato HH:MM"
+    # Normalizadas (2026-11-01, 09:00) para casar com as horas da Open-Meteo e as chaves do cache
+    data, hora = dia.isoformat(), instante.strftime("%H:%M")
+    coords = store.coordenadas(praia)
+    if not coords:
+        return "Coordenadas da praia não disponíveis"
+    return praia, coords, data, hora
+
+@app.route("/praias/previsao/lote", methods=["POST"])
+def previsao_em_lote():
+    """Boletim e previsão de várias consultas (id, data, hora) em uma única requisição."""
+    store = dataset.atual()
+    corpo = request.get_json(silent=True)
+    itens = corpo.get("itens") if isinstance(corpo, dict) else corpo
+    if not isinstance(itens, list):
+        return json_response({"message": 'Envie uma lista de consultas [{"id": 1, "data": "YYYY-MM-DD", "hora": "HH:MM"}, ...]'}, status=400)
+    if len(itens) > MAX_ITENS_LOTE:
+        return json_response({"message": f"O lote aceita no máximo {MAX_ITENS_LOTE} consultas"}, status=400)
+
+    validados = [validar_item_lote(store, item) for item in itens]
+    # Consultas válidas vão todas juntas à Open-Meteo, agrupadas por ponto e dia
+    consultas = [(v[1][0], v[1][1], v[2], v[3]) for v in validados if not isinstance(v, str)]
+    previsoes = iter(get_forecasts_lote(consultas))
+
+    resultados = []
+    for item, validado in zip(itens, validados):
+        if isinstance(validado, str):
+            resultados.append({"consulta": item, "erro": validado})
+            continue
+        praia, _, data, hora = validado
+        boletim = boletim_vigente(store, praia, data) or f"Não há boletim da Semace disponível para {data}"
+        resultados.append({"consulta": item, "boletim": boletim, "previsao": next(previsoes)})
+    return json_response({"resultados": resultados})
+
 @app.route("/praias/status/<status>")
 def filtrar_por_status(status):
     """Filtrar praias por Status."""
+    store = dataset.atual()
     data = request.args.get("data")
     hora = request.args.get("hora", "12:00")
     status_map = {"propria": "Própria para banho", "impropria": "Imprópria para banho"}
@@ -154,51 +359,39 @@ def filtrar_por_status(status):
     if not status_filtrado:
         return json_response({"message": "Status inválido. Use 'propria' ou 'impropria'."}, status=400)
     
-    resultado = [p for p in praias if p.get("Status") == status_filtrado]
+    resultado = store.por_status(status_filtrado)
     if not resultado:
         return json_response({"message": f"Nenhuma praia encontrada com status {status_filtrado}"}, status=404)
 
     if not data:
-        return json_response(resultado)
+        return resposta_estatica(store, ("status", status_filtrado), lambda: resultado)
+    data = normalizar_data(data)
+    if not data:
+        return json_response({"message": MENSAGEM_DATA_INVALIDA}, status=400)
 
-    resposta_com_previsao = []
-    for praia in resultado:
-        item = {"praia": praia}
-        codigo = extrair_codigo(praia)
-        if codigo and codigo in COORDENADAS_POR_CODIGO:
-            lat_str, lon_str = COORDENADAS_POR_CODIGO[codigo].split(", ")
-            lat, lon = float(lat_str), float(lon_str)
-            item["previsao"] = get_forecast(lat, lon, data, hora)
-        else:
-            item["previsao"] = {"mensagem": "Coordenadas não disponíveis"}
-        resposta_com_previsao.append(item)
-        
-    return json_response(resposta_com_previsao)
+    return responder_com_previsoes(store, resultado, data, hora)
 
 @app.route("/praias/zona/<zona>")
 def filtrar_por_zona(zona):
     """Filtrar praias por Zona."""
+    store = dataset.atual()
     data = request.args.get("data")
     hora = request.args.get("hora", "12:00")
     zona_filtrada = zona.capitalize()
     
-    resultado = [p for p in praias if p.get("Zona") == zona_filtrada]
+    resultado = store.por_zona(zona_filtrada)
     if not resultado:
         return json_response({"message": f"Nenhuma praia encontrada na zona {zona_filtrada}"}, status=404)
 
     if not data:
-        return json_response(resultado)
+        return resposta_estatica(store, ("zona", zona_filtrada), lambda: resultado)
+    data = normalizar_data(data)
+    if not data:
+        return json_response({"message": MENSAGEM_DATA_INVALIDA}, status=400)
 
-    resposta_com_previsao = []
-    for praia in resultado:
-        item = {"praia": praia}
-        codigo = extrair_codigo(praia)
-        if codigo and codigo in COORDENADAS_POR_CODIGO:
-            lat_str, lon_str = COORDENADAS_POR_CODIGO[codigo].split(", ")
-            lat, lon = float(lat_str), float(lon_str)
-            item["previsao"] = get_forecast(lat, lon, data, hora)
-        else:
-            item["previsao"] = {"mensagem": "Coordenadas não disponíveis"}
-        resposta_com_previsao.append(item)
-        
-    return json_response(resposta_com_previsao)
+    return responder_com_previsoes(store, resultado, data, hora)
+
+@app.route("/metrics")
+def metricas():
+    """Métricas da API no formato texto do Prometheus."""
+    return Response(metrics.registro.expor(), content_type="text/plain; version=0.0.4; charset=utf-8")
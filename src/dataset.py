@@ -0,0 +1,113 @@
+# src/dataset.py
+
+import csv
+import os
+import threading
+
+from .snapshot import SEM_ORIGEM, Snapshot, abrir_snapshot, caminho_do_snapshot, escrever_snapshot
+from .store import PraiaStore, snapshot_de_registros
+
+# --- Localização do CSV gerado pelo scraper ---
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SRC_DIR)
+CSV_FILE = os.path.join(BASE_DIR, "boletim_fortaleza.csv")
+
+
+# Colunas numéricas do CSV; as demais são texto, e células vazias viram None
+COLUNAS_INTEIRAS = ("id",)
+
+
+def carregar_praias(caminho):
+    """Lê o CSV do boletim e devolve a lista de praias (uma lista de dicts).
+
+    Usa apenas o módulo csv da biblioteca padrão: a API não precisa do pandas,
+    que fica restrito à ingestão (scraper.py).
+    """
+    with open(caminho, newline="", encoding="utf-8") as f:
+        registros = [{k: (v if v != "" else None) for k, v in linha.items()} for linha in csv.DictReader(f)]
+    for registro in registros:
+        for coluna in COLUNAS_INTEIRAS:
+            if registro.get(coluna) is not None:
+                registro[coluna] = int(registro[coluna])
+    return registros
+
+
+def carregar_store(caminho):
+    """Monta o PraiaStore do boletim a partir do snapshot binário do CSV (ver snapshot.py).
+
+    O snapshot fica em SNAPSHOT_DIR e é mapeado em memória somente leitura, com as
+    páginas compartilhadas entre os workers. Se ele não existir ou tiver sido gerado
+    a partir de outra versão do CSV, o primeiro processo a perceber relê o CSV e
+    grava um snapshot novo; os demais apenas o mapeiam, sem ler o CSV.
+
+    Só leitura no histórico: quem grava o boletim nele é a ingestão (scraper.py).
+    """
+    versao = versao_do_arquivo(caminho) or SEM_ORIGEM
+    caminho_snapshot = caminho_do_snapshot(caminho)
+    snapshot = abrir_snapshot(caminho_snapshot)
+    if snapshot is None or snapshot.origem != versao:
+        dados = snapshot_de_registros(carregar_praias(caminho), versao)
+        try:
+            escrever_snapshot(dados, caminho_snapshot)
+        except OSError as e:
+            print(f"AVISO: Falha ao gravar o snapshot {caminho_snapshot}: {e}")
+        snapshot = abrir_snapshot(caminho_snapshot)
+        if snapshot is None or snapshot.origem != versao:
+            # Sem o arquivo (ou trocado por outro worker no meio): serve a cópia em memória
+            snapshot = Snapshot(dados)
+    return PraiaStore(snapshot=snapshot)
+
+
+def versao_do_arquivo(caminho):
+    """Identifica uma versão do arquivo: muda sempre que o scraper troca o CSV (os.replace)."""
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class Dataset:
+    """PraiaStore carregado do snapshot do CSV, trocado de forma atômica quando o arquivo muda.
+
+    Cada chamada a `atual()` faz apenas um `os.stat` no CSV; se o scraper (em
+    qualquer worker) publicou um boletim novo, o snapshot dessa versão é mapeado
+    (ou gerado, pelo primeiro worker a perceber) e a referência é substituída de
+    uma vez. Se a carga falhar, o último conjunto válido continua sendo servido.
+    """
+
+    def __init__(self, caminho=CSV_FILE, loader=carregar_store):
+        self.caminho = caminho
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._estado = (None, PraiaStore([]))  # (versão, store)
+        self._versao_invalida = None
+        self.recarregar()
+
+    @property
+    def versao(self):
+        return self._estado[0]
+
+    def recarregar(self):
+        versao = versao_do_arquivo(self.caminho)
+        with self._lock:
+            if versao is not None and versao in (self._estado[0], self._versao_invalida):
+                return False
+            if versao is None:
+                if self._estado[0] is None:
+                    print(f"AVISO: O arquivo {self.caminho} não foi encontrado. A API iniciará com dados vazios.")
+                return False
+            try:
+                store = self.loader(self.caminho)
+            except Exception as e:
+                print(f"AVISO: Falha ao carregar {self.caminho}: {e}. Mantendo os dados anteriores.")
+                self._versao_invalida = versao
+                return False
+            self._estado = (versao, store)
+            return True
+
+    def atual(self):
+        versao = versao_do_arquivo(self.caminho)
+        if versao != self._estado[0] and versao != self._versao_invalida:
+            self.recarregar()
+        return self._estado[1]
@@ -0,0 +1,617 @@
+# src/forecast.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import previsoes_desatualizadas, upstream_circuito, upstream_erros, upstream_latencia, upstream_recusas
+from .protecao import CircuitBreaker, CircuitoAberto, LimiteDeTaxa, TokenBucket
+
+# --- Configuração da Open-Meteo ---
+# As URLs podem ser trocadas por um stub local (ver benchmarks/stub_open_meteo.py)
+WEATHER_URL = os.environ.get("OPEN_METEO_WEATHER_URL", "https://api.open-meteo.com/v1/forecast")
+MARINE_URL = os.environ.get("OPEN_METEO_MARINE_URL", "https://marine-api.open-meteo.com/v1/marine")
+WEATHER_VARS = "temperature_2m,apparent_temperature,windspeed_10m,winddirection_10m,precipitation,cloudcover"
+MARINE_VARS = "wave_height,wave_direction,wave_period"
+TIMEZONE = "America/Fortaleza"
+
+# Campos da resposta horária -> chaves expostas pela API
+WEATHER_CAMPOS = {
+    "temperature_2m": "temperatura_c",
+    "apparent_temperature": "sensacao_termica_c",
+    "windspeed_10m": "velocidade_vento_kmh",
+    "winddirection_10m": "direcao_vento_graus",
+    "precipitation": "chuva_mm",
+    "cloudcover": "cobertura_nuvens_pct",
+}
+MARINE_CAMPOS = {
+    "wave_height": "altura_ondas_m",
+    "wave_direction": "direcao_ondas_graus",
+    "wave_period": "periodo_ondas_s",
+}
+
+UPSTREAMS = {
+    "weather": (WEATHER_URL, WEATHER_VARS),
+    "marine": (MARINE_URL, MARINE_VARS),
+}
+
+# Janela de datas servida pela Open-Meteo: até DIAS_PASSADOS dias antes de hoje e HORIZONTE_DIAS
+# dias contando hoje. Datas fora dela nunca vão ao upstream (nem gastam fichas do balde)
+DIAS_PASSADOS = int(os.environ.get("OPEN_METEO_DIAS_PASSADOS", "92"))
+HORIZONTE_DIAS = int(os.environ.get("OPEN_METEO_HORIZONTE_DIAS", "16"))
+
+# Falhas esperadas ao obter uma previsão (rede, HTTP, recusa local ou resposta fora do formato)
+ERROS_PREVISAO = (requests.exceptions.RequestException, ValueError, KeyError, AttributeError)
+
+# --- Configuração do cache (sobrescrevível por variáveis de ambiente) ---
+CACHE_TTL_S = float(os.environ.get("FORECAST_CACHE_TTL", "1800"))
+CACHE_MAX_ENTRIES = int(os.environ.get("FORECAST_CACHE_MAX", "1024"))
+# Depois de vencido o TTL, o valor ainda é servido por este tempo enquanto é revalidado em segundo plano
+CACHE_STALE_S = float(os.environ.get("FORECAST_CACHE_STALE", "21600"))
+
+
+class ForecastCache:
+    """Cache LRU com TTL das séries horárias da Open-Meteo, com janela stale-while-revalidate.
+
+    A chave é (lat, lon, data, upstream) e o valor é o bloco "hourly" completo
+    do dia, de modo que qualquer hora do mesmo ponto/dia é respondida localmente.
+    Uma entrada é "fresca" até `ttl`; depois disso, e por mais `stale_ttl`
+    segundos, `lookup` ainda a devolve marcada como vencida, para ser servida
+    enquanto uma revalidação acontece em segundo plano. Depois da janela, ela
+    continua guardada (até sair pelo limite do LRU) como último valor conhecido.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_S, max_entries=CACHE_MAX_ENTRIES, clock=time.monotonic, stale_ttl=CACHE_STALE_S):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Devolve (valor, fresco). Valor None se a chave não existe ou passou da janela stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            agora = self._clock()
+            if entry is None or entry[0] + self.stale_ttl <= agora:
+                # Passada a janela stale, a entrada fica só como último valor conhecido (ver ultimo_valido)
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if entry[0] <= agora:
+                self.stale_hits += 1
+                return entry[1], False
+            self.hits += 1
+            return entry[1], True
+
+    def ultimo_valido(self, key):
+        """Último valor gravado para a chave, mesmo vencido (para quando a Open-Meteo estiver indisponível)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "entradas": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": ((self.hits + self.stale_hits) / total) if total else 0.0,
+            }
+
+
+# --- Configuração do cliente HTTP ---
+CONNECT_TIMEOUT_S = float(os.environ.get("FORECAST_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT_S = float(os.environ.get("FORECAST_READ_TIMEOUT", "10"))
+MAX_WORKERS = int(os.environ.get("FORECAST_MAX_WORKERS", "8"))
+# Máximo de pontos por requisição; lotes maiores são divididos e buscados em paralelo
+BATCH_SIZE = int(os.environ.get("FORECAST_BATCH_SIZE", "50"))
+
+
+class ForecastClient:
+    """Cliente HTTP da Open-Meteo com conexões reaproveitadas, timeouts e um pool de threads limitado.
+
+    O pool é criado sob demanda e recriado após um fork, pois threads não
+    sobrevivem ao fork dos workers do gunicorn.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT_S, read_timeout=READ_TIMEOUT_S, max_workers=MAX_WORKERS):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(UPSTREAMS), pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        return self.session.get(url, timeout=self.timeout)
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="forecast")
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def map(self, func, *iterables):
+        """Executa func em paralelo no pool e devolve os resultados na ordem de entrada."""
+        futures = [self.executor.submit(func, *args) for args in zip(*iterables)]
+        return [f.result() for f in futures]
+
+
+cache = ForecastCache()
+client = ForecastClient()
+
+
+# --- Funções auxiliares ---
+# Pontos que caem no mesmo nó da grade do modelo recebem da Open-Meteo os mesmos
+# dados, então são buscados uma vez só. O nó de cada ponto é o que a própria
+# Open-Meteo informa (latitude/longitude da resposta), aprendido na primeira
+# busca do ponto: até lá, o ponto é buscado por si mesmo.
+_nos = {upstream: {} for upstream in UPSTREAMS}  # {upstream: {(lat, lon): nó}}
+_representantes = {upstream: {} for upstream in UPSTREAMS}  # {upstream: {nó: (lat, lon)}}
+
+
+def registrar_no(ponto, upstream, local):
+    """Guarda o nó da grade que a Open-Meteo usou para o ponto (campos latitude/longitude da resposta)."""
+    lat, lon = local.get("latitude"), local.get("longitude")
+    if lat is None or lon is None:
+        return
+    no = (round(float(lat), 4), round(float(lon), 4))
+    _nos.setdefault(upstream, {}).setdefault(ponto, no)
+    _representantes.setdefault(upstream, {}).setdefault(no, ponto)
+
+
+def representante(ponto, upstream):
+    """Ponto cujos dados valem para `ponto` no upstream: o primeiro buscado no mesmo nó da grade."""
+    no = _nos.get(upstream, {}).get(ponto)
+    if no is None:
+        return ponto
+    return _representantes[upstream].get(no, ponto)
+
+
+def representantes(pontos, upstream):
+    """Representantes distintos de uma lista de pontos, na ordem em que aparecem."""
+    return list(dict.fromkeys(representante(ponto, upstream) for ponto in pontos))
+
+
+def hoje_local():
+    """Data de hoje no fuso das previsões (America/Fortaleza), não no do servidor."""
+    return datetime.now(ZoneInfo(TIMEZONE)).date()
+
+
+def na_janela(data):
+    """Indica se a data, já normalizada (YYYY-MM-DD), está na janela da Open-Meteo."""
+    try:
+        dia = date.fromisoformat(data)
+    except (TypeError, ValueError):
+        return False
+    hoje = hoje_local()
+    return dia.isoformat() == data and hoje - timedelta(days=DIAS_PASSADOS) <= dia < hoje + timedelta(days=HORIZONTE_DIAS)
+
+
+def cache_key(lat, lon, data, upstream):
+    return (round(float(lat), 6), round(float(lon), 6), data, upstream)
+
+
+def build_url(upstream, pontos, inicio, fim=None):
+    """Monta a URL da Open-Meteo para um ou mais pontos (latitudes/longitudes separadas por vírgula) e um intervalo de datas."""
+    base_url, variaveis = UPSTREAMS[upstream]
+    latitudes = ",".join(str(lat) for lat, _ in pontos)
+    longitudes = ",".join(str(lon) for _, lon in pontos)
+    return (f"{base_url}?latitude={latitudes}&longitude={longitudes}&hourly={variaveis}"
+            f"&start_date={inicio}&end_date={fim or inicio}&timezone={TIMEZONE}")
+
+
+def dividir_por_dia(hourly):
+    """Separa um bloco "hourly" de vários dias em {data: bloco "hourly" do dia}."""
+    indices = {}
+    for i, t in enumerate(hourly.get("time", [])):
+        indices.setdefault(t[:10], []).append(i)
+    series = {k: v for k, v in hourly.items() if isinstance(v, list)}
+    return {dia: {k: [v[i] for i in idx] for k, v in series.items()} for dia, idx in indices.items()}
+
+
+def _split_cached(pontos, data, upstream):
+    """Separa os pontos em cache dos que precisam ir à Open-Meteo, já divididos em blocos de BATCH_SIZE.
+
+    Devolve também os pontos servidos com valor vencido, que devem ser revalidados.
+    """
+    resultado = {}
+    faltantes = []
+    vencidos = []
+    for ponto in dict.fromkeys(pontos):
+        hourly, fresco = cache.lookup(cache_key(ponto[0], ponto[1], data, upstream))
+        if hourly is not None:
+            resultado[ponto] = hourly
+            if not fresco:
+                vencidos.append(ponto)
+        else:
+            faltantes.append(ponto)
+    blocos = [faltantes[i:i + BATCH_SIZE] for i in range(0, len(faltantes), BATCH_SIZE)]
+    return resultado, blocos, vencidos
+
+
+# --- Proteção da Open-Meteo ---
+# Balde de fichas compartilhado entre os workers (cota de chamadas) e um disjuntor por upstream
+limite_de_taxa = TokenBucket()
+disjuntores = {upstream: CircuitBreaker() for upstream in UPSTREAMS}
+upstream_circuito.funcao = lambda: {(u,): d.estado for u, d in disjuntores.items()}
+
+
+def _autorizar_chamada(upstream):
+    """Levanta CircuitoAberto ou LimiteDeTaxa se a chamada não deve ir à Open-Meteo."""
+    if not disjuntores[upstream].permitir():
+        upstream_recusas.inc(upstream, "circuito_aberto")
+        raise CircuitoAberto(f"Circuito aberto para a Open-Meteo ({upstream})")
+    if not limite_de_taxa.consumir():
+        # A chamada de teste do disjuntor (se era uma) não vai à rede: não pode deixá-lo meio aberto
+        disjuntores[upstream].cancelar()
+        upstream_recusas.inc(upstream, "limite_de_taxa")
+        raise LimiteDeTaxa(f"Limite de chamadas à Open-Meteo atingido ({upstream})")
+
+
+def fetch_range_uncached(pontos, inicio, fim, upstream):
+    """Busca na Open-Meteo o intervalo [inicio, fim] dos pontos numa única chamada e grava cada dia no cache.
+
+    Devolve {(lat, lon): {data: bloco "hourly"}}. Levanta RequestException se a
+    chamada for recusada localmente (disjuntor aberto ou limite de taxa), falhar
+    ou não responder 200; erros de rede, 429 e 5xx contam como falha no disjuntor.
+    """
+    _autorizar_chamada(upstream)
+    resultado = {ponto: {} for ponto in pontos}
+    t0 = time.perf_counter()
+    try:
+        response = client.get(build_url(upstream, pontos, inicio, fim))
+    except requests.exceptions.RequestException as e:
+        upstream_erros.inc(upstream, type(e).__name__)
+        disjuntores[upstream].falha()
+        raise
+    finally:
+        upstream_latencia.observe(time.perf_counter() - t0, upstream)
+    if response.status_code != 200:
+        upstream_erros.inc(upstream, f"http_{response.status_code}")
+        if response.status_code == 429 or response.status_code >= 500:
+            disjuntores[upstream].falha()
+        else:
+            disjuntores[upstream].sucesso()
+        raise requests.exceptions.HTTPError(f"Open-Meteo ({upstream}) respondeu {response.status_code}", response=response)
+    disjuntores[upstream].sucesso()
+    payload = response.json()
+    # Com um único ponto a Open-Meteo responde um objeto; com vários, uma lista
+    locais = payload if isinstance(payload, list) else [payload]
+    for ponto, local in zip(pontos, locais):
+        registrar_no(ponto, upstream, local)
+        hourly = local.get("hourly")
+        if not hourly:
+            continue
+        for dia, hourly_dia in dividir_por_dia(hourly).items():
+            cache.set(cache_key(ponto[0], ponto[1], dia, upstream), hourly_dia)
+            resultado[ponto][dia] = hourly_dia
+    return resultado
+
+
+def ultimos_validos(pontos, inicio, fim, upstream):
+    """Últimos blocos conhecidos de cada ponto e dia, marcados como desatualizados, ou {} se não houver."""
+    try:
+        dias = datas_do_intervalo(inicio, fim)
+    except ValueError:
+        return {}  # datas fora do formato YYYY-MM-DD nunca foram gravadas no cache
+    resultado = {}
+    for ponto in pontos:
+        for dia in dias:
+            hourly = cache.ultimo_valido(cache_key(ponto[0], ponto[1], dia, upstream))
+            if hourly is not None:
+                resultado.setdefault(ponto, {})[dia] = {**hourly, "desatualizado": True}
+    if resultado:
+        previsoes_desatualizadas.inc(upstream, valor=len(resultado))
+    return resultado
+
+
+def _fetch_range_safe(pontos, inicio, fim, upstream):
+    """Como fetch_range_uncached, mas, se a Open-Meteo falhar, devolve os últimos blocos conhecidos."""
+    try:
+        return fetch_range_uncached(pontos, inicio, fim, upstream)
+    except ERROS_PREVISAO as e:
+        print(f"Erro ao obter previsão ({upstream}): {e}")
+        return ultimos_validos(pontos, inicio, fim, upstream)
+
+
+def _fetch_safe(pontos, data, upstream):
+    return {ponto: dias.get(data) for ponto, dias in _fetch_range_safe(pontos, data, data, upstream).items()}
+
+
+# Revalidações em andamento, para não disparar a mesma busca várias vezes
+_revalidando = set()
+_revalidando_lock = threading.Lock()
+
+
+def _revalidar(pontos, inicio, upstream, fim=None):
+    fim = fim or inicio
+    chaves = {ponto: (ponto[0], ponto[1], inicio, fim, upstream) for ponto in pontos}
+    with _revalidando_lock:
+        pontos = [p for p, k in chaves.items() if k not in _revalidando]
+        _revalidando.update(chaves[p] for p in pontos)
+    if not pontos:
+        return
+
+    def tarefa():
+        # Sem fallback: ninguém espera esta resposta, e o valor vencido segue no cache
+        try:
+            fetch_range_uncached(pontos, inicio, fim, upstream)
+        except ERROS_PREVISAO as e:
+            print(f"Erro ao revalidar previsão ({upstream}): {e}")
+        finally:
+            with _revalidando_lock:
+                _revalidando.difference_update(chaves[p] for p in pontos)
+
+    client.executor.submit(tarefa)
+
+
+def fetch_hourly_dias(pedidos, upstreams):
+    """Retorna {data: {upstream: {(lat, lon): bloco "hourly"}}} para pedidos {data: pontos}, consultando o cache antes da Open-Meteo.
+
+    Valores vencidos (dentro da janela stale) são devolvidos na hora e revalidados
+    em segundo plano.
+
+    Pontos no mesmo nó da grade do upstream são resolvidos por um único
+    representante. Os pontos que faltam no cache vão numa única requisição por
+    upstream e por dia (ou em blocos de BATCH_SIZE), e todas as requisições são
+    disparadas em paralelo no pool do cliente. A resposta (uma lista, na ordem
+    dos pontos) é separada por ponto; pontos sem dados ficam com valor None ou ausentes.
+    """
+    resultados = {}
+    tarefas = []
+    por_upstream = {}
+    for data, pontos in pedidos.items():
+        for upstream in upstreams:
+            por_upstream[data, upstream] = reps = {ponto: representante(ponto, upstream) for ponto in pontos}
+            resultados[data, upstream], blocos, vencidos = _split_cached(list(dict.fromkeys(reps.values())), data, upstream)
+            tarefas.extend((bloco, data, upstream) for bloco in blocos)
+            if vencidos:
+                _revalidar(vencidos, data, upstream)
+
+    if len(tarefas) == 1:
+        bloco, data, upstream = tarefas[0]
+        resultados[data, upstream].update(_fetch_safe(bloco, data, upstream))
+    elif tarefas:
+        parciais = client.map(_fetch_safe, *zip(*tarefas))
+        for (_, data, upstream), parcial in zip(tarefas, parciais):
+            resultados[data, upstream].update(parcial)
+
+    # Cada ponto recebe o bloco do representante do seu nó da grade
+    saida = {data: {} for data in pedidos}
+    for (data, upstream), reps in por_upstream.items():
+        obtidos = resultados[data, upstream]
+        saida[data][upstream] = {ponto: obtidos[rep] for ponto, rep in reps.items() if rep in obtidos}
+    return saida
+
+
+def fetch_hourly_many(pontos, data, upstreams):
+    """Retorna {upstream: {(lat, lon): bloco "hourly"}} dos pontos em uma data (ver fetch_hourly_dias)."""
+    return fetch_hourly_dias({data: pontos}, upstreams)[data]
+
+
+def datas_do_intervalo(inicio, fim):
+    """Datas YYYY-MM-DD de inicio a fim, inclusive."""
+    primeiro, ultimo = date.fromisoformat(inicio), date.fromisoformat(fim)
+    return [(primeiro + timedelta(days=i)).isoformat() for i in range((ultimo - primeiro).days + 1)]
+
+
+def fetch_range(lat, lon, inicio, fim, upstreams=("weather", "marine")):
+    """Retorna {upstream: {data: bloco "hourly"}} do ponto para cada dia de [inicio, fim].
+
+    Se todos os dias estiverem no cache, nada vai à Open-Meteo (dias vencidos são
+    revalidados em segundo plano, numa única chamada). Se faltar algum, o
+    intervalo inteiro vem numa única chamada por upstream, em paralelo.
+    """
+    dias = datas_do_intervalo(inicio, fim)
+    resultados = {}
+    tarefas = []
+    for upstream in upstreams:
+        rep = representante((lat, lon), upstream)
+        resultados[upstream] = {}
+        vencido = False
+        for dia in dias:
+            hourly, fresco = cache.lookup(cache_key(rep[0], rep[1], dia, upstream))
+            if hourly is None:
+                tarefas.append((rep, upstream))
+                break
+            resultados[upstream][dia] = hourly
+            vencido = vencido or not fresco
+        else:
+            if vencido:
+                _revalidar([rep], inicio, upstream, fim)
+
+    if tarefas:
+        buscados = client.map(lambda t: _fetch_range_safe([t[0]], inicio, fim, t[1]).get(t[0], {}), tarefas)
+        for (_, upstream), por_dia in zip(tarefas, buscados):
+            resultados[upstream] = por_dia
+    return resultados
+
+
+def get_forecast_range(lat, lon, inicio, fim, horas=None):
+    """Séries horárias (orientadas a colunas) de tempo e mar do ponto entre inicio e fim.
+
+    `horas` é um conjunto opcional de "HH:MM" para filtrar as horas de cada dia.
+    Retorna {"tempo": [...], "desatualizado": [...], "<campo>": [...], ...}, com None
+    onde não houver dado; "desatualizado" marca as horas vindas do último bloco
+    conhecido porque a Open-Meteo estava indisponível.
+    """
+    blocos = fetch_range(lat, lon, inicio, fim)
+    series = {"tempo": [], "desatualizado": []}
+    series.update({campo: [] for campo in WEATHER_CAMPOS.values()})
+    series.update({campo: [] for campo in MARINE_CAMPOS.values()})
+    for dia in datas_do_intervalo(inicio, fim):
+        weather = blocos.get("weather", {}).get(dia) or {}
+        marine = blocos.get("marine", {}).get(dia) or {}
+        indices_weather = {t: i for i, t in enumerate(weather.get("time", []))}
+        indices_marine = {t: i for i, t in enumerate(marine.get("time", []))}
+        # Horas de qualquer um dos upstreams: um dia sem tempo ainda traz as séries de mar, e vice-versa
+        for instante in sorted(indices_weather.keys() | indices_marine.keys()):
+            if horas is not None and instante[11:16] not in horas:
+                continue
+            i, j = indices_weather.get(instante), indices_marine.get(instante)
+            series["tempo"].append(instante)
+            series["desatualizado"].append(bool((i is not None and weather.get("desatualizado"))
+                                                or (j is not None and marine.get("desatualizado"))))
+            for origem, destino in WEATHER_CAMPOS.items():
+                series[destino].append(weather[origem][i] if i is not None and origem in weather else None)
+            for origem, destino in MARINE_CAMPOS.items():
+                series[destino].append(marine[origem][j] if j is not None and origem in marine else None)
+    return series
+
+
+def extract_hour(hourly, campos, target_time):
+    """Extrai os valores de uma hora específica de um bloco "hourly"."""
+    if not hourly or target_time not in hourly.get("time", []):
+        return None
+    idx = hourly["time"].index(target_time)
+    return {destino: hourly[origem][idx] for origem, destino in campos.items()}
+
+
+def build_forecast(weather_hourly, marine_hourly, data, hora_consulta):
+    """Monta o dicionário de previsão da API a partir dos blocos horários de tempo e mar."""
+    forecast = {"mensagem": f"Previsão não disponível para {data} às {hora_consulta}", "data": data, "hora_consulta": hora_consulta}
+    target_time = f"{data}T{hora_consulta}"
+    weather = extract_hour(weather_hourly, WEATHER_CAMPOS, target_time)
+    marine = extract_hour(marine_hourly, MARINE_CAMPOS, target_time)
+    if weather:
+        forecast.update(weather)
+        forecast["mensagem"] = "Previsão obtida com sucesso"
+    if marine:
+        forecast.update(marine)
+    # Open-Meteo indisponível: valores do último bloco obtido com sucesso
+    if any(h and h.get("desatualizado") for h in (weather_hourly, marine_hourly)) and (weather or marine):
+        forecast["desatualizada"] = True
+        forecast["mensagem"] = "Previsão desatualizada: Open-Meteo indisponível, exibindo a última obtida com sucesso"
+    return forecast
+
+
+def get_forecasts(pontos, data, hora=None):
+    """Previsões de vários pontos com uma chamada de tempo e uma de mar, feitas em paralelo.
+
+    Retorna {(lat, lon): previsão}.
+    """
+    hora_consulta = hora if hora else "12:00"
+    blocos = {}
+    if na_janela(data):
+        try:
+            blocos = fetch_hourly_many(pontos, data, ["weather", "marine"])
+        except ERROS_PREVISAO as e:
+            print(f"Erro ao obter previsão: {e}")
+    weather = blocos.get("weather", {})
+    marine = blocos.get("marine", {})
+    return {
+        ponto: build_forecast(weather.get(ponto), marine.get(ponto), data, hora_consulta)
+        for ponto in pontos
+    }
+
+
+def iter_forecasts(pontos, data, hora=None):
+    """Gera (ponto, previsão) à medida que os blocos de tempo e de mar de cada ponto ficam prontos.
+
+    Os pontos já em cache saem imediatamente; os demais saem quando as
+    requisições (as mesmas de get_forecasts, em blocos por upstream) que os
+    cobrem terminam, na ordem em que terminarem.
+    """
+    hora_consulta = hora if hora else "12:00"
+    if not na_janela(data):
+        for ponto in dict.fromkeys(pontos):
+            yield ponto, build_forecast(None, None, data, hora_consulta)
+        return
+    upstreams = ("weather", "marine")
+    reps = {u: {ponto: representante(ponto, u) for ponto in pontos} for u in upstreams}
+    obtidos = {}
+    concluidos = {}
+    futuros = {}
+    for upstream in upstreams:
+        unicos = list(dict.fromkeys(reps[upstream].values()))
+        obtidos[upstream], blocos, vencidos = _split_cached(unicos, data, upstream)
+        concluidos[upstream] = set(obtidos[upstream])
+        if vencidos:
+            _revalidar(vencidos, data, upstream)
+        for bloco in blocos:
+            futuros[client.executor.submit(_fetch_safe, bloco, data, upstream)] = (bloco, upstream)
+
+    pendentes = list(dict.fromkeys(pontos))
+
+    def prontos():
+        nonlocal pendentes
+        restantes = []
+        for ponto in pendentes:
+            if all(reps[u][ponto] in concluidos[u] for u in upstreams):
+                yield ponto, build_forecast(obtidos["weather"].get(reps["weather"][ponto]),
+                                            obtidos["marine"].get(reps["marine"][ponto]), data, hora_consulta)
+            else:
+                restantes.append(ponto)
+        pendentes = restantes
+
+    yield from prontos()
+    for futuro in as_completed(futuros):
+        bloco, upstream = futuros[futuro]
+        # Os cabeçalhos já foram enviados: um bloco que falhar sai sem previsão, mas cada ponto ainda tem sua linha
+        try:
+            obtidos[upstream].update(futuro.result())
+        except ERROS_PREVISAO as e:
+            print(f"Erro ao obter previsão ({upstream}): {e}")
+        concluidos[upstream].update(bloco)
+        yield from prontos()
+
+
+def get_forecasts_lote(consultas):
+    """Previsões de várias consultas (lat, lon, data, hora), agrupadas por dia e por ponto.
+
+    Cada ponto (ou nó da grade) e dia distinto é buscado uma única vez, e os
+    dias são buscados em paralelo. Retorna a lista de previsões na ordem das consultas.
+    """
+    pedidos = {}
+    for lat, lon, data, _ in consultas:
+        if na_janela(data):
+            pedidos.setdefault(data, {})[(lat, lon)] = None
+    try:
+        blocos = fetch_hourly_dias({data: list(pontos) for data, pontos in pedidos.items()}, ["weather", "marine"])
+    except ERROS_PREVISAO as e:
+        print(f"Erro ao obter previsão: {e}")
+        blocos = {}
+    previsoes = []
+    for lat, lon, data, hora in consultas:
+        do_dia = blocos.get(data, {})
+        previsoes.append(build_forecast(do_dia.get("weather", {}).get((lat, lon)), do_dia.get("marine", {}).get((lat, lon)),
+                                        data, hora if hora else "12:00"))
+    return previsoes
+
+
+def get_forecast(lat, lon, data, hora=None):
+    return get_forecasts([(lat, lon)], data, hora)[(lat, lon)]
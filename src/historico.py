@@ -0,0 +1,153 @@
+# src/historico.py
+
+import json
+import os
+import sqlite3
+import threading
+import urllib.parse
+from datetime import datetime
+
+from .store import extrair_codigo, parse_data
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SRC_DIR)
+DB_FILE = os.environ.get("HISTORICO_DB", os.path.join(BASE_DIR, "boletins_historico.sqlite3"))
+
+# Uma linha por (ponto, boletim). A chave primária (codigo, inicio, numero) é o próprio
+# índice B-tree da tabela (WITHOUT ROWID), então "o boletim em vigor para um ponto numa
+# data" é uma busca O(log n) seguida da leitura de uma única linha.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boletins (
+    numero TEXT PRIMARY KEY,
+    periodo TEXT,
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL,
+    tipos_amostragem TEXT,
+    data_extracao TEXT
+);
+CREATE TABLE IF NOT EXISTS praias_boletim (
+    codigo TEXT NOT NULL,
+    inicio TEXT NOT NULL,
+    numero TEXT NOT NULL REFERENCES boletins(numero),
+    fim TEXT NOT NULL,
+    registro TEXT NOT NULL,
+    PRIMARY KEY (codigo, inicio, numero)
+) WITHOUT ROWID;
+"""
+
+
+def periodo_em_datas(periodo: str):
+    """Converte "dd/mm/aaaa a dd/mm/aaaa" em ("aaaa-mm-dd", "aaaa-mm-dd"), ou None."""
+    try:
+        inicio_str, fim_str = [p.strip() for p in str(periodo).split(" a ")]
+        inicio = datetime.strptime(inicio_str, "%d/%m/%Y").strftime("%Y-%m-%d")
+        fim = datetime.strptime(fim_str, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+    return inicio, fim
+
+
+def _limpar(valor):
+    # NaN vindo do pandas vira null no JSON
+    return None if isinstance(valor, float) and valor != valor else valor
+
+
+class Historico:
+    """Armazena todos os boletins já processados (somente inclusão) em SQLite.
+
+    Cada boletim é gravado uma única vez, identificado por Numero_Boletim. Só a
+    ingestão grava; a API abre o banco somente para leitura e, enquanto ele não
+    existir, responde que não há boletim. As conexões são abertas por thread, e o
+    modo WAL permite que vários workers leiam enquanto o scraper grava.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or DB_FILE
+        self._local = threading.local()
+        self._schema_ok = False
+
+    def _conexao(self, escrita=False):
+        """Conexão da thread atual; a de leitura (mode=ro) nunca cria o arquivo nem o esquema."""
+        modo = "escrita" if escrita else "leitura"
+        pid, conn = getattr(self._local, modo, (None, None))
+        if conn is None or pid != os.getpid():
+            if escrita:
+                conn = sqlite3.connect(self.caminho, timeout=10, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                if not self._schema_ok:
+                    conn.executescript(SCHEMA)
+                    self._schema_ok = True
+            else:
+                uri = f"file:{urllib.parse.quote(os.path.abspath(self.caminho))}?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, timeout=10, check_same_thread=False)
+            setattr(self._local, modo, (os.getpid(), conn))
+        return conn
+
+    def registrar_boletim(self, registros) -> bool:
+        """Grava as praias de um boletim (linhas do CSV). Retorna False se o boletim já existia."""
+        registros = [{k: _limpar(v) for k, v in r.items()} for r in registros]
+        if not registros:
+            return False
+        primeiro = registros[0]
+        numero = primeiro.get("Numero_Boletim")
+        datas = periodo_em_datas(primeiro.get("Periodo"))
+        if not numero or not datas:
+            return False
+        inicio, fim = datas
+
+        conn = self._conexao(escrita=True)
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO boletins (numero, periodo, inicio, fim, tipos_amostragem, data_extracao) VALUES (?, ?, ?, ?, ?, ?)",
+                (numero, primeiro.get("Periodo"), inicio, fim, primeiro.get("Tipos_Amostragem"), primeiro.get("Data_Extração")),
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO praias_boletim (codigo, inicio, numero, fim, registro) VALUES (?, ?, ?, ?, ?)",
+                [(extrair_codigo(r), inicio, numero, fim, json.dumps(r, ensure_ascii=False)) for r in registros],
+            )
+        return True
+
+    def boletim_vigente(self, codigo: str, data: str):
+        """Registro da praia no boletim em vigor para o ponto na data (YYYY-MM-DD), ou None.
+
+        A data é normalizada antes da consulta (as datas são comparadas como texto
+        ISO); uma data inválida devolve None.
+        """
+        dia = parse_data(data)
+        if not codigo or dia is None:
+            return None
+        data = dia.isoformat()
+        try:
+            linha = self._conexao().execute(
+                "SELECT fim, registro FROM praias_boletim WHERE codigo = ? AND inicio <= ? ORDER BY inicio DESC, numero DESC LIMIT 1",
+                (codigo, data),
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Banco (ou tabela) ainda não criado pela ingestão
+            return None
+        if linha is None or linha[0] < data:
+            return None
+        return json.loads(linha[1])
+
+    def numeros(self):
+        try:
+            return [n for (n,) in self._conexao().execute("SELECT numero FROM boletins ORDER BY inicio")]
+        except sqlite3.OperationalError:
+            return []
+
+
+historico = Historico()
+
+
+# Carga inicial, uma única vez, do boletim já existente no CSV (anterior à primeira
+# execução do scraper): `python -m src.historico [caminho do CSV]`
+if __name__ == "__main__":
+    import sys
+    from .dataset import CSV_FILE, carregar_praias
+    caminho_csv = sys.argv[1] if len(sys.argv) > 1 else CSV_FILE
+    if historico.registrar_boletim(carregar_praias(caminho_csv)):
+        print(f"Boletim de {caminho_csv} gravado em {historico.caminho}.")
+    else:
+        print(f"Boletim de {caminho_csv} já estava em {historico.caminho} (ou não tem número e período).")
@@ -0,0 +1,29 @@
+# src/ingestao.py
+
+import json
+import os
+import subprocess
+import sys
+
+from .dataset import BASE_DIR
+
+# O scraper (pandas, pdfplumber, camelot/OpenCV) roda em um processo separado,
+# para que nenhum worker da API carregue essas bibliotecas na memória.
+MODULO_SCRAPER = f"{__package__}.scraper"
+TIMEOUT_S = float(os.environ.get("SCRAPER_TIMEOUT", "600"))
+
+
+def executar_scraper(forcar=False, timeout=TIMEOUT_S):
+    """Executa `python -m src.scraper --relatorio` em um subprocesso e devolve o relatório de run_scraper.
+
+    A saída do scraper é repassada ao log do worker; o relatório vem em JSON na
+    última linha. Levanta RuntimeError se o processo falhar.
+    """
+    comando = [sys.executable, "-m", MODULO_SCRAPER, "--relatorio"] + (["--forcar"] if forcar else [])
+    processo = subprocess.run(comando, cwd=BASE_DIR, capture_output=True, text=True, timeout=timeout)
+    linhas = processo.stdout.strip().splitlines()
+    for linha in linhas[:-1]:
+        print(linha)
+    if processo.returncode != 0 or not linhas:
+        raise RuntimeError(f"O scraper terminou com código {processo.returncode}: {processo.stderr.strip()[-500:]}")
+    return json.loads(linhas[-1])
@@ -0,0 +1,191 @@
+# src/metrics.py
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Buckets padrão de latência, em segundos
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _formatar_labels(nomes, valores):
+    if not nomes:
+        return ""
+    pares = ",".join(f'{n}="{_escapar(str(v))}"' for n, v in zip(nomes, valores))
+    return "{" + pares + "}"
+
+
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    """Base das métricas. `funcao`, se informada, fornece os valores na hora da exposição.
+
+    A função devolve um valor (ou None, para não expor nada) ou um dict
+    {valores dos labels: valor}.
+    """
+
+    tipo = None
+
+    def __init__(self, nome, descricao, labels=(), funcao=None):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self.funcao = funcao
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def amostras(self):
+        """Lista de (sufixo, nomes dos labels, valores dos labels, valor)."""
+        if self.funcao is not None:
+            resultado = self.funcao()
+            if not isinstance(resultado, dict):
+                resultado = {(): resultado} if resultado is not None else {}
+            return [("", self.labels, chave, valor) for chave, valor in resultado.items()]
+        with self._lock:
+            return [("", self.labels, chave, valor) for chave, valor in self._valores.items()]
+
+    def expor(self, fixos=()):
+        """Texto da métrica; `fixos` são pares (label, valor) acrescentados a todas as amostras."""
+        nomes_fixos = tuple(n for n, _ in fixos)
+        valores_fixos = tuple(v for _, v in fixos)
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+        for sufixo, nomes, valores, valor in self.amostras():
+            rotulos = _formatar_labels(nomes_fixos + tuple(nomes), valores_fixos + tuple(valores))
+            linhas.append(f"{self.nome}{sufixo}{rotulos} {_numero(valor)}")
+        return "\n".join(linhas)
+
+
+class Counter(Metrica):
+    """Contador acumulado. Com `funcao`, expõe um total mantido em outro lugar (ex.: acertos do cache)."""
+
+    tipo = "counter"
+
+    def inc(self, *labels, valor=1):
+        with self._lock:
+            self._valores[labels] = self._valores.get(labels, 0) + valor
+
+
+class Gauge(Metrica):
+    """Valor instantâneo. Também aceita uma função, avaliada apenas na exposição."""
+
+    tipo = "gauge"
+
+    def set(self, valor, *labels):
+        with self._lock:
+            self._valores[labels] = valor
+
+
+class Histogram(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, descricao, labels=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(nome, descricao, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, *labels):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._valores.get(labels)
+            if serie is None:
+                serie = self._valores[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def amostras(self):
+        nomes = self.labels + ("le",)
+        resultado = []
+        with self._lock:
+            series = [(chave, list(contagens), soma, total) for chave, (contagens, soma, total) in self._valores.items()]
+        for chave, contagens, soma, total in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                resultado.append(("_bucket", nomes, chave + (_numero(limite),), acumulado))
+            resultado.append(("_sum", self.labels, chave, soma))
+            resultado.append(("_count", self.labels, chave, total))
+        return resultado
+
+
+class Registro:
+    """Conjunto de métricas do processo, exposto no formato texto do Prometheus.
+
+    Com vários workers do gunicorn, cada processo tem seu próprio registro e
+    /metrics responde com o do worker que atendeu a requisição. Por isso todas
+    as amostras levam o label `pid`: séries de workers diferentes não se
+    confundem, e o Prometheus as soma com `sum without (pid)` (para contadores,
+    sobre `rate`, o que também absorve o reinício de um worker).
+    """
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, *args, **kwargs):
+        return self.registrar(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.registrar(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.registrar(Histogram(*args, **kwargs))
+
+    def expor(self):
+        fixos = (("pid", os.getpid()),)
+        return "\n".join(m.expor(fixos) for m in self._metricas) + "\n"
+
+
+registro = Registro()
+
+# --- Métricas da API ---
+http_requisicoes = registro.counter(
+    "api_http_requisicoes_total", "Requisições atendidas, por rota e status HTTP.", ("rota", "metodo", "status"))
+http_latencia = registro.histogram(
+    "api_http_latencia_segundos", "Latência das requisições, por rota e status HTTP.", ("rota", "metodo", "status"))
+
+# --- Métricas da Open-Meteo ---
+upstream_latencia = registro.histogram(
+    "api_upstream_latencia_segundos", "Latência das chamadas à Open-Meteo, por upstream (weather/marine).", ("upstream",))
+upstream_erros = registro.counter(
+    "api_upstream_erros_total", "Chamadas à Open-Meteo que falharam, por upstream e tipo de erro.", ("upstream", "tipo"))
+upstream_recusas = registro.counter(
+    "api_upstream_recusas_total", "Chamadas à Open-Meteo recusadas localmente, por upstream e motivo.", ("upstream", "motivo"))
+upstream_circuito = registro.gauge(
+    "api_upstream_circuito_estado", "Estado do disjuntor de cada upstream (0 fechado, 1 meio aberto, 2 aberto).", ("upstream",))
+previsoes_desatualizadas = registro.counter(
+    "api_previsoes_desatualizadas_total", "Pontos servidos com o último bloco conhecido por falha da Open-Meteo.", ("upstream",))
+prefetch_execucoes = registro.counter(
+    "api_prefetch_execucoes_total", "Execuções do prefetch de previsões, por resultado.", ("resultado",))
+prefetch_ultima_execucao = registro.gauge(
+    "api_prefetch_ultima_execucao_timestamp", "Horário (epoch) da última execução do prefetch de previsões neste processo.")
+
+# --- Métricas do scraper ---
+scraper_etapa = registro.gauge(
+    "api_scraper_etapa_segundos", "Duração de cada etapa do scraper na última execução em que ela ocorreu.", ("etapa",))
+scraper_execucoes = registro.counter(
+    "api_scraper_execucoes_total", "Execuções do scraper, por resultado.", ("resultado",))
+scraper_ultima_execucao = registro.gauge(
+    "api_scraper_ultima_execucao_timestamp", "Horário (epoch) da última execução do scraper neste processo.")
+
+
+def registrar_scraper(relatorio):
+    """Registra o relatório devolvido por run_scraper (ou a falha, se relatorio for None)."""
+    scraper_ultima_execucao.set(time.time())
+    if relatorio is None:
+        scraper_execucoes.inc("erro")
+        return
+    scraper_execucoes.inc("alterado" if relatorio.get("alterado") else "sem_mudanca")
+    for etapa, duracao in relatorio.get("etapas", {}).items():
+        scraper_etapa.set(duracao, etapa)
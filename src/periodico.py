@@ -0,0 +1,44 @@
+# src/periodico.py
+
+import os
+import threading
+
+
+class TarefaPeriodica:
+    """Thread de fundo, uma por processo, que chama `passo()` a cada `espera` segundos até `parar()`.
+
+    Base do `Atualizador` (refresher.py) e do `Prefetcher` (prefetch.py).
+    """
+
+    def __init__(self, nome, espera, passo):
+        self.nome = nome
+        self.espera = espera
+        self.passo = passo
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                self.passo()
+            except Exception as e:
+                # Um passo com erro não pode encerrar a thread: garantir_iniciado não a recria no mesmo processo
+                print(f"AVISO: A tarefa {self.nome} falhou com o erro: {e}")
+            self._parar.wait(self.espera)
+
+    def garantir_iniciado(self):
+        """Inicia a thread no processo atual (após o fork dos workers, threads do processo pai não existem)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._parar = threading.Event()
+            self._thread = threading.Thread(target=self._loop, name=self.nome, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,74 @@
+# src/prefetch.py
+
+import os
+import time
+from datetime import timedelta
+
+from . import forecast
+from .forecast import hoje_local
+from .metrics import prefetch_execucoes, prefetch_ultima_execucao
+from .periodico import TarefaPeriodica
+from .store import COORDENADAS
+
+# --- Configuração do prefetch (sobrescrevível por variáveis de ambiente) ---
+# Deve ser menor que FORECAST_CACHE_TTL para que as entradas sejam renovadas antes de vencer
+INTERVALO_S = float(os.environ.get("FORECAST_PREFETCH_INTERVALO", "900"))
+DIAS = int(os.environ.get("FORECAST_PREFETCH_DIAS", "7"))
+ATIVO = os.environ.get("FORECAST_PREFETCH", "1") != "0"
+
+
+def pontos_conhecidos():
+    """Todos os pontos de coleta com coordenadas, sem repetição."""
+    return list(dict.fromkeys(COORDENADAS.values()))
+
+
+def prefetch(pontos=None, dias=DIAS, hoje=None, upstreams=tuple(forecast.UPSTREAMS)):
+    """Busca as previsões de `dias` dias a partir de hoje para todos os pontos e as grava no cache.
+
+    Cada upstream recebe uma chamada por bloco de BATCH_SIZE nós da grade,
+    cobrindo o intervalo inteiro. Retorna o número de chamadas que falharam.
+    """
+    pontos = pontos_conhecidos() if pontos is None else pontos
+    inicio = hoje or hoje_local()
+    fim = inicio + timedelta(days=dias - 1)
+    tarefas = []
+    for upstream in upstreams:
+        # Uma única coordenada por nó da grade do upstream (pontos ainda não buscados vão por si mesmos)
+        unicos = forecast.representantes(pontos, upstream)
+        tarefas.extend((unicos[i:i + forecast.BATCH_SIZE], upstream) for i in range(0, len(unicos), forecast.BATCH_SIZE))
+
+    def buscar(tarefa):
+        bloco, upstream = tarefa
+        try:
+            forecast.fetch_range_uncached(bloco, inicio.isoformat(), fim.isoformat(), upstream)
+            return 0
+        except forecast.ERROS_PREVISAO as e:
+            print(f"Erro no prefetch de previsões ({upstream}): {e}")
+            return 1
+
+    return sum(forecast.client.map(buscar, tarefas))
+
+
+class Prefetcher(TarefaPeriodica):
+    """Mantém o cache de previsões aquecido para todos os pontos e os próximos dias.
+
+    Cada worker tem sua própria thread (o cache é por processo), que roda
+    `prefetch` a cada `intervalo` segundos. Assim o volume de chamadas à
+    Open-Meteo é fixo (uma por upstream e por bloco de pontos a cada intervalo,
+    por worker), independente do tráfego; as requisições encontram o cache
+    fresco ou, se o prefetch atrasar, vencido e revalidado em segundo plano.
+    """
+
+    def __init__(self, tarefa=prefetch, intervalo=INTERVALO_S):
+        super().__init__("prefetch-previsoes", intervalo, self.executar)
+        self.tarefa = tarefa
+
+    def executar(self):
+        try:
+            falhas = self.tarefa()
+        except Exception as e:
+            print(f"AVISO: O prefetch de previsões falhou com o erro: {e}")
+            falhas = None
+        prefetch_ultima_execucao.set(time.time())
+        prefetch_execucoes.inc("ok" if falhas == 0 else "erro")
+        return falhas
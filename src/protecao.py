@@ -0,0 +1,150 @@
+# src/protecao.py
+
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: balde apenas por processo
+    fcntl = None
+
+import requests
+
+from .dataset import BASE_DIR
+
+# --- Configuração (sobrescrevível por variáveis de ambiente) ---
+# Cota gratuita da Open-Meteo: 10.000 chamadas por dia (~0,115/s); o balde é compartilhado pelos workers
+TAXA_POR_S = float(os.environ.get("OPEN_METEO_TAXA", "0.1"))
+RAJADA = float(os.environ.get("OPEN_METEO_RAJADA", "100"))
+BUCKET_FILE = os.environ.get("OPEN_METEO_BUCKET_FILE", os.path.join(BASE_DIR, ".open_meteo.bucket"))
+# O circuito abre após FALHAS falhas seguidas e fica aberto por ESPERA_S segundos antes de testar de novo
+CIRCUITO_FALHAS = int(os.environ.get("OPEN_METEO_CIRCUITO_FALHAS", "5"))
+CIRCUITO_ESPERA_S = float(os.environ.get("OPEN_METEO_CIRCUITO_ESPERA", "30"))
+
+
+class UpstreamIndisponivel(requests.exceptions.RequestException):
+    """Chamada à Open-Meteo recusada localmente, sem ir à rede."""
+
+
+class LimiteDeTaxa(UpstreamIndisponivel):
+    pass
+
+
+class CircuitoAberto(UpstreamIndisponivel):
+    pass
+
+
+class TokenBucket:
+    """Balde de fichas compartilhado entre processos por um arquivo com trava (flock).
+
+    O arquivo guarda (fichas, horário da última recarga); cada chamada trava o
+    arquivo, recarrega `taxa` fichas por segundo até `capacidade` e tenta
+    consumir uma. Sem ficha disponível, a chamada é recusada na hora (sem
+    esperar), para que a latência continue limitada.
+    """
+
+    ESTADO = struct.Struct("<dd")
+
+    def __init__(self, taxa=TAXA_POR_S, capacidade=RAJADA, caminho=BUCKET_FILE, clock=time.time):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.caminho = caminho
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+        self._local = None  # estado em memória quando não há fcntl
+
+    def _arquivo(self):
+        if self._pid != os.getpid():
+            self._fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _recarregar(self, estado, agora):
+        fichas, ultimo = estado if estado else (self.capacidade, agora)
+        return min(self.capacidade, fichas + max(0.0, agora - ultimo) * self.taxa)
+
+    def consumir(self, fichas=1):
+        """Consome fichas se houver. Retorna False se o limite foi atingido.
+
+        Se o arquivo do balde não puder ser usado (OSError), a chamada é liberada:
+        um problema local não deve derrubar as previsões.
+        """
+        try:
+            return self._consumir(fichas)
+        except OSError as e:
+            print(f"AVISO: Balde de chamadas à Open-Meteo indisponível ({self.caminho}): {e}")
+            return True
+
+    def _consumir(self, fichas):
+        with self._lock:
+            agora = self._clock()
+            if fcntl is None:
+                disponiveis = self._recarregar(self._local, agora)
+                ok = disponiveis >= fichas
+                self._local = (disponiveis - fichas if ok else disponiveis, agora)
+                return ok
+            fd = self._arquivo()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                dados = os.pread(fd, self.ESTADO.size, 0)
+                disponiveis = self._recarregar(self.ESTADO.unpack(dados) if len(dados) == self.ESTADO.size else None, agora)
+                ok = disponiveis >= fichas
+                os.pwrite(fd, self.ESTADO.pack(disponiveis - fichas if ok else disponiveis, agora), 0)
+                return ok
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class CircuitBreaker:
+    """Disjuntor por upstream: depois de `limiar` falhas seguidas, recusa chamadas por `espera` segundos.
+
+    Passada a espera, deixa passar uma única chamada de teste (meio aberto): se
+    ela der certo, o circuito fecha; se falhar, abre de novo. O estado é por
+    processo.
+    """
+
+    FECHADO, MEIO_ABERTO, ABERTO = 0, 1, 2
+
+    def __init__(self, limiar=CIRCUITO_FALHAS, espera=CIRCUITO_ESPERA_S, clock=time.monotonic):
+        self.limiar = limiar
+        self.espera = espera
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.falhas = 0
+        self.estado = self.FECHADO
+        self._aberto_em = 0.0
+
+    def permitir(self):
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return True
+            if self.estado == self.ABERTO and self._clock() - self._aberto_em >= self.espera:
+                self.estado = self.MEIO_ABERTO
+                return True
+            return False
+
+    def cancelar(self):
+        """Desfaz a passagem para meio aberto quando a chamada de teste não chegou à rede.
+
+        O circuito volta a aberto com o horário original, de modo que a próxima
+        chamada já pode ser a de teste.
+        """
+        with self._lock:
+            if self.estado == self.MEIO_ABERTO:
+                self.estado = self.ABERTO
+
+    def sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.estado = self.FECHADO
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.estado == self.MEIO_ABERTO or self.falhas >= self.limiar:
+                self.estado = self.ABERTO
+                self._aberto_em = self._clock()
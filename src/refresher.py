@@ -0,0 +1,124 @@
+# src/refresher.py
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, apenas entre threads
+    fcntl = None
+
+from .dataset import BASE_DIR
+from .periodico import TarefaPeriodica
+
+# --- Configuração da atualização periódica (sobrescrevível por variáveis de ambiente) ---
+INTERVALO_S = float(os.environ.get("SCRAPER_INTERVALO", "21600"))  # 6 horas
+VERIFICACAO_S = float(os.environ.get("SCRAPER_VERIFICACAO", "60"))
+ATIVO = os.environ.get("SCRAPER_ATUALIZACAO_AUTOMATICA", "1") != "0"
+
+LOCK_FILE = os.path.join(BASE_DIR, ".scraper.lock")
+STAMP_FILE = os.path.join(BASE_DIR, ".scraper.stamp")
+
+
+class TravaEntreProcessos:
+    """Trava exclusiva e não bloqueante baseada em arquivo (flock), compartilhada pelos workers do gunicorn."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._fd = None
+        self._thread_lock = threading.Lock()
+
+    def adquirir(self):
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+        try:
+            fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            # Disco cheio ou somente leitura: esta tentativa falha, as próximas tentam de novo
+            print(f"AVISO: Não foi possível abrir a trava {self.caminho}: {e}")
+            self._thread_lock.release()
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            self._thread_lock.release()
+            return False
+        self._fd = fd
+        return True
+
+    def liberar(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+def ultima_execucao(stamp_file=STAMP_FILE):
+    try:
+        return os.path.getmtime(stamp_file)
+    except OSError:
+        return 0.0
+
+
+def marcar_execucao(stamp_file=STAMP_FILE):
+    """Atualiza o carimbo da última execução. Retorna False se o arquivo não puder ser gravado."""
+    try:
+        with open(stamp_file, "a"):
+            pass
+        os.utime(stamp_file, None)
+    except OSError as e:
+        print(f"AVISO: Não foi possível gravar o carimbo {stamp_file}: {e}")
+        return False
+    return True
+
+
+class Atualizador(TarefaPeriodica):
+    """Executa o scraper periodicamente em segundo plano, com no máximo uma execução por vez entre todos os workers.
+
+    Cada worker mantém uma thread que acorda a cada `verificacao` segundos e olha o
+    carimbo da última execução. Se ela tiver mais de `intervalo` segundos, tenta a
+    trava de arquivo; quem conseguir roda o scraper e atualiza o carimbo, os demais
+    seguem servindo. O CSV novo é trocado de forma atômica pelo scraper e cada
+    worker o percebe sozinho pelo `Dataset`.
+    """
+
+    def __init__(self, tarefa, intervalo=INTERVALO_S, verificacao=VERIFICACAO_S,
+                 lock_file=LOCK_FILE, stamp_file=STAMP_FILE):
+        super().__init__("atualizador-boletim", verificacao, self.executar_se_necessario)
+        self.tarefa = tarefa
+        self.intervalo = intervalo
+        self.stamp_file = stamp_file
+        self.trava = TravaEntreProcessos(lock_file)
+        # Última execução neste processo, para respeitar o intervalo mesmo sem conseguir gravar o carimbo
+        self._ultima_local = 0.0
+
+    def _ultima_execucao(self):
+        return max(ultima_execucao(self.stamp_file), self._ultima_local)
+
+    def executar_se_necessario(self):
+        """Roda a tarefa se o intervalo venceu e nenhum outro worker estiver rodando. Retorna True se rodou."""
+        if time.time() - self._ultima_execucao() < self.intervalo:
+            return False
+        if not self.trava.adquirir():
+            return False
+        try:
+            # Outro worker pode ter terminado entre a checagem e a trava
+            if time.time() - self._ultima_execucao() < self.intervalo:
+                return False
+            try:
+                print("Executando scraper para atualizar boletim...")
+                self.tarefa()
+            except Exception as e:
+                print(f"AVISO: O scraper falhou com o erro: {e}")
+                print("A API continuará usando o arquivo CSV existente, se disponível.")
+            # Marca mesmo em caso de falha, para não martelar a SEMACE a cada verificação
+            self._ultima_local = time.time()
+            marcar_execucao(self.stamp_file)
+            return True
+        finally:
+            self.trava.liberar()
@@ -0,0 +1,132 @@
+# src/respostas.py
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from flask import Response
+
+try:
+    import brotli  # opcional: habilita Content-Encoding: br
+except ImportError:
+    brotli = None
+
+MAX_AGE_S = int(os.environ.get("RESPOSTA_MAX_AGE", "300"))
+# Corpos menores que isso não compensam a compressão
+TAMANHO_MIN_COMPRESSAO = 512
+
+
+def serializar(data, pretty=False) -> str:
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=4)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def quer_pretty(request) -> bool:
+    return request.args.get("pretty", "").lower() in ("1", "true", "sim")
+
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def quer_ndjson(request) -> bool:
+    """Streaming NDJSON sob demanda: ?stream=1 ou Accept: application/x-ndjson."""
+    if request.args.get("stream", "").lower() in ("1", "true", "sim"):
+        return True
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(itens):
+    """Resposta em streaming com um objeto JSON compacto por linha, enviado assim que cada item é gerado."""
+    return Response((serializar(item) + "\n" for item in itens), mimetype=NDJSON_MIMETYPE)
+
+
+class RespostaPronta:
+    """Corpo JSON já serializado, com ETag forte e versões comprimidas geradas uma única vez."""
+
+    def __init__(self, corpo: bytes):
+        self.corpo = corpo
+        self.etag = hashlib.sha256(corpo).hexdigest()[:32]
+        self._codificados = {"identity": corpo}
+        self._lock = threading.Lock()
+
+    def codificado(self, encoding):
+        with self._lock:
+            if encoding not in self._codificados:
+                if encoding == "br":
+                    self._codificados[encoding] = brotli.compress(self.corpo)
+                else:
+                    self._codificados[encoding] = gzip.compress(self.corpo, compresslevel=6, mtime=0)
+            return self._codificados[encoding]
+
+    def etag_de(self, encoding):
+        # Cada representação tem sua própria ETag forte
+        return self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+
+
+def escolher_encoding(request, tamanho) -> str:
+    if tamanho < TAMANHO_MIN_COMPRESSAO:
+        return "identity"
+    aceitos = request.accept_encodings
+    if brotli is not None and aceitos["br"] > 0:
+        return "br"
+    if aceitos["gzip"] > 0:
+        return "gzip"
+    return "identity"
+
+
+class CacheRespostas:
+    """Respostas de rotas que só mudam com o boletim, renderizadas uma vez por versão do conjunto de dados.
+
+    `versao` é qualquer objeto que identifique o conjunto de dados (comparado por
+    igualdade); quando ela muda, as respostas antigas são descartadas. Requisições
+    com If-None-Match correspondente recebem 304 sem corpo.
+    """
+
+    def __init__(self, max_age=MAX_AGE_S):
+        self.max_age = max_age
+        self._versao = None
+        self._respostas = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, versao, chave, pretty, gerar):
+        with self._lock:
+            if versao != self._versao:
+                self._respostas = {}
+                self._versao = versao
+            pronta = self._respostas.get((chave, pretty))
+            if pronta is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if pronta is None:
+            pronta = RespostaPronta(serializar(gerar(), pretty).encode("utf-8"))
+            with self._lock:
+                if versao == self._versao:
+                    self._respostas[(chave, pretty)] = pronta
+        return pronta
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entradas": len(self._respostas), "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": (self.hits / total) if total else 0.0}
+
+    def responder(self, request, versao, chave, gerar):
+        pronta = self.obter(versao, chave, quer_pretty(request), gerar)
+        encoding = escolher_encoding(request, len(pronta.corpo))
+        etag = pronta.etag_de(encoding)
+        headers = {"Cache-Control": f"public, max-age={self.max_age}", "Vary": "Accept-Encoding"}
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(pronta.codificado(encoding), status=200, mimetype="application/json", headers=headers)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        return response
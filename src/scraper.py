@@ -5,12 +5,17 @@ from urllib.parse import urljoin
 import pdfplumber
 import unicodedata
 from datetime import datetime, timedelta
-import camelot
 import pandas as pd
 import os
+import json
+import hashlib
+import time
+from contextlib import contextmanager
 
 # Importação direta, pois este arquivo pode ser executado de forma independente
 from .coordenadas import COORDENADAS_POR_CODIGO
+from .historico import historico
+from .dataset import carregar_praias
 
 def extract_point_code(nome: str) -> str:
     return (nome[:3] or "").strip().upper()
@@ -43,11 +48,60 @@ def classify_zona(nome: str) -> str:
     if any(k in n for k in oeste_kw): return "Oeste"
     return "Desconhecida"
 
-# A LÓGICA PRINCIPAL AGORA ESTÁ DENTRO DESTA FUNÇÃO
-def run_scraper():
-    print("Iniciando o processo de scraping...")
-    url_base = "https://www.semace.ce.gov.br/boletim-de-balneabilidade/"
-    res = requests.get(url_base)
+# --- Caminhos usados pelo scraper ---
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(SRC_DIR)
+URL_BASE = "https://www.semace.ce.gov.br/boletim-de-balneabilidade/"
+ARQUIVO_PDF = os.path.join(SRC_DIR, "boletim_fortaleza.pdf")
+CAMINHO_CSV = os.path.join(BASE_DIR, "boletim_fortaleza.csv")
+# Estado da última execução (validadores HTTP, URL e hash do PDF) e cache de PDFs já processados
+ESTADO_FILE = os.path.join(BASE_DIR, ".scraper_estado.json")
+CACHE_DIR = os.path.join(BASE_DIR, ".scraper_cache")
+CACHE_MAX_ARQUIVOS = 20
+# Motor de extração das tabelas: "camelot" (modo stream, usa OpenCV) ou "pdfplumber" (leve, mesma leitura do cabeçalho)
+ENGINE = os.environ.get("SCRAPER_ENGINE", "camelot")
+ENGINES = ("camelot", "pdfplumber")
+
+@contextmanager
+def medir_etapa(etapas, nome: str):
+    """Acumula em etapas[nome] a duração (s) do bloco; sem efeito se etapas for None."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if etapas is not None:
+            etapas[nome] = etapas.get(nome, 0.0) + time.perf_counter() - inicio
+
+def carregar_estado(caminho: str = None) -> dict:
+    try:
+        with open(caminho or ESTADO_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def salvar_json_atomico(dados, caminho):
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(caminho_tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho)
+
+def cabecalhos_condicionais(validadores: dict) -> dict:
+    """Monta If-None-Match / If-Modified-Since a partir do ETag / Last-Modified guardados."""
+    headers = {}
+    if validadores.get("etag"):
+        headers["If-None-Match"] = validadores["etag"]
+    if validadores.get("last_modified"):
+        headers["If-Modified-Since"] = validadores["last_modified"]
+    return headers
+
+def validadores_da_resposta(res) -> dict:
+    return {"etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified")}
+
+def encontrar_boletim_url(estado: dict):
+    """Devolve (url do último boletim, validadores da página). A url é None se a página não mudou (304)."""
+    res = requests.get(URL_BASE, headers=cabecalhos_condicionais(estado.get("pagina", {})))
+    if res.status_code == 304:
+        return None, estado.get("pagina", {})
     soup = BeautifulSoup(res.text, "html.parser")
 
     links_boletim = [
@@ -58,22 +112,33 @@ def run_scraper():
     if not links_boletim:
         raise ValueError("Nenhum boletim encontrado.")
 
-    ultimo_boletim_url = urljoin(url_base, links_boletim[0])
-    
-    # Define o caminho do PDF dentro do diretório src
-    SRC_DIR = os.path.dirname(os.path.abspath(__file__))
-    arquivo_pdf = os.path.join(SRC_DIR, "boletim_fortaleza.pdf")
+    return urljoin(URL_BASE, links_boletim[0]), validadores_da_resposta(res)
 
-    res = requests.get(ultimo_boletim_url, stream=True)
-    with open(arquivo_pdf, "wb") as f:
+def baixar_pdf(url: str, arquivo_pdf: str, estado: dict):
+    """Baixa o PDF (condicionalmente, se a URL for a mesma da última execução).
+
+    Devolve (sha256 do conteúdo, validadores) ou (None, validadores) se o servidor
+    respondeu 304. O arquivo só é substituído quando o download termina.
+    """
+    validadores_anteriores = estado.get("pdf", {}) if estado.get("url") == url else {}
+    res = requests.get(url, stream=True, headers=cabecalhos_condicionais(validadores_anteriores))
+    if res.status_code == 304:
+        return None, validadores_anteriores
+    res.raise_for_status()
+
+    sha = hashlib.sha256()
+    caminho_tmp = f"{arquivo_pdf}.{os.getpid()}.tmp"
+    with open(caminho_tmp, "wb") as f:
         for chunk in res.iter_content(8192):
+            sha.update(chunk)
             f.write(chunk)
+    os.replace(caminho_tmp, arquivo_pdf)
     print(f"PDF salvo em {arquivo_pdf}")
+    return sha.hexdigest(), validadores_da_resposta(res)
 
-    with pdfplumber.open(arquivo_pdf) as pdf:
-        texto_pg1 = pdf.pages[0].extract_text() or ""
-        texto_pg1 = " ".join(texto_pg1.split())
-
+def extrair_cabecalho(texto_pg1: str) -> dict:
+    """Extrai número do boletim, período e tipos de amostragem do texto da primeira página."""
+    texto_pg1 = " ".join(texto_pg1.split())
     periodo = ""
     numero_boletim = ""
     tipos_amostragem = ""
@@ -87,63 +152,232 @@ def run_scraper():
         resto = texto_pg1[tipos_index + len("Tipos de amostras:"):].strip()
         tipos_amostragem = resto.split(".")[0].strip()
 
-    dias_periodo = expand_periodo(periodo)
-    data_extracao = datetime.today().strftime("%Y-%m-%d")
+    return {"numero_boletim": numero_boletim, "periodo": periodo, "tipos_amostragem": tipos_amostragem}
+
+def clean_status_token(tok: str) -> str:
+    tok = tok.strip().upper()
+    return tok if tok in ("P", "I") else ""
+
+def is_noise_row(nome: str, status: str) -> bool:
+    txt = f"{str(nome)} {str(status)}".lower()
+    noise_terms = ["nome", "status", "trecho", "ponto", "boletim", "semace"]
+    if len(txt.strip()) < 3: return True
+    return any(term in txt for term in noise_terms)
+
+def normalizar_linha(nomes: list, status_tokens: list) -> list:
+    """Aplica as regras de limpeza comuns aos dois motores a uma célula de nomes e uma de status."""
+    status_tokens = [clean_status_token(x) for x in status_tokens]
+    status_tokens = [x for x in status_tokens if x]
+    if not nomes or not status_tokens: return []
+    linhas = []
+    if len(status_tokens) == 1 and len(nomes) > 1:
+        for n in nomes:
+            if not is_noise_row(n, status_tokens[0]):
+                linhas.append({"Nome": n, "Status": status_tokens[0]})
+    else:
+        for n, s in zip(nomes, status_tokens):
+            if not is_noise_row(n, s):
+                linhas.append({"Nome": n, "Status": s})
+    return linhas
+
+def extrair_linhas_camelot(arquivo_pdf: str) -> list:
+    """Extrai as linhas (Nome, Status P/I) das tabelas do PDF com o camelot (modo stream)."""
+    import camelot  # importado sob demanda: carrega OpenCV e só é necessário neste motor
 
     tables = camelot.read_pdf(arquivo_pdf, pages="1-end", flavor="stream")
-    
-    def clean_status_token(tok: str) -> str:
-        tok = tok.strip().upper()
-        return tok if tok in ("P", "I") else ""
-
-    def is_noise_row(nome: str, status: str) -> bool:
-        txt = f"{str(nome)} {str(status)}".lower()
-        noise_terms = ["nome", "status", "trecho", "ponto", "boletim", "semace"]
-        if len(txt.strip()) < 3: return True
-        return any(term in txt for term in noise_terms)
-
-    dfs_norm = []
+
+    linhas = []
     for t in tables:
         df_raw = t.df.copy()
         if df_raw.shape[1] < 2: continue
         df_raw = df_raw.iloc[:, :2]
         df_raw.columns = ["Nome", "Status"]
-        linhas = []
         for _, row in df_raw.iterrows():
             nomes = [x.strip() for x in row["Nome"].split("\n") if x.strip()]
-            status_tokens = [clean_status_token(x) for x in row["Status"].split("\n")]
-            status_tokens = [x for x in status_tokens if x]
-            if not nomes or not status_tokens: continue
-            if len(status_tokens) == 1 and len(nomes) > 1:
-                for n in nomes:
-                    if not is_noise_row(n, status_tokens[0]):
-                        linhas.append({"Nome": n, "Status": status_tokens[0]})
-            else:
-                for n, s in zip(nomes, status_tokens):
-                    if not is_noise_row(n, s):
-                        linhas.append({"Nome": n, "Status": s})
-        if linhas:
-            dfs_norm.append(pd.DataFrame(linhas))
-    
-    df = pd.concat(dfs_norm, ignore_index=True) if dfs_norm else pd.DataFrame(columns=["Nome","Status"])
+            linhas.extend(normalizar_linha(nomes, row["Status"].split("\n")))
+    return linhas
+
+# Tolerâncias do motor pdfplumber, em pontos do PDF
+TOLERANCIA_LINHA = 3
+ESPACO_MIN_COLUNA_STATUS = 30
+INICIO_COLUNA_STATUS = 0.85  # fração da largura da página
+
+def extrair_linhas_pdfplumber(page) -> list:
+    """Extrai as linhas (Nome, Status P/I) de uma página a partir das palavras posicionadas pelo pdfplumber.
+
+    As palavras são agrupadas em linhas pela coordenada vertical; uma linha da
+    tabela é aquela cuja última palavra está isolada na coluna da direita (o status).
+    """
+    palavras = sorted(page.extract_words(), key=lambda w: (round(w["top"]), w["x0"]))
+    linhas_texto = []
+    for w in palavras:
+        if linhas_texto and abs(linhas_texto[-1][0]["top"] - w["top"]) <= TOLERANCIA_LINHA:
+            linhas_texto[-1].append(w)
+        else:
+            linhas_texto.append([w])
+
+    inicio_status = page.width * INICIO_COLUNA_STATUS
+    linhas = []
+    for palavras_linha in linhas_texto:
+        palavras_linha.sort(key=lambda w: w["x0"])
+        if len(palavras_linha) < 2: continue
+        *nome, status = palavras_linha
+        if status["x0"] < inicio_status or status["x0"] - nome[-1]["x1"] < ESPACO_MIN_COLUNA_STATUS: continue
+        linhas.extend(normalizar_linha([" ".join(w["text"] for w in nome)], [status["text"]]))
+    return linhas
+
+def parse_pdf(arquivo_pdf: str, engine: str = None, etapas: dict = None) -> dict:
+    """Lê o cabeçalho (pdfplumber) e as tabelas do boletim com o motor escolhido.
+
+    Com o motor "pdfplumber", cabeçalho e tabelas saem da mesma abertura do PDF.
+    Se `etapas` for informado, recebe a duração de cada etapa.
+    """
+    engine = engine or ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de extração desconhecido: {engine}. Use um de {ENGINES}.")
+    with pdfplumber.open(arquivo_pdf) as pdf:
+        with medir_etapa(etapas, "cabecalho_pdfplumber"):
+            texto_pg1 = pdf.pages[0].extract_text() or ""
+            resultado = extrair_cabecalho(texto_pg1)
+        if engine == "pdfplumber":
+            with medir_etapa(etapas, "tabelas_pdfplumber"):
+                resultado["linhas"] = [linha for page in pdf.pages for linha in extrair_linhas_pdfplumber(page)]
+    if engine == "camelot":
+        with medir_etapa(etapas, "tabelas_camelot"):
+            resultado["linhas"] = extrair_linhas_camelot(arquivo_pdf)
+    return resultado
+
+def parse_pdf_com_cache(arquivo_pdf: str, sha: str, cache_dir: str = None, engine: str = None, etapas: dict = None) -> dict:
+    """Devolve o resultado do parse guardado para este hash de PDF (e motor), ou processa e guarda."""
+    cache_dir = cache_dir or CACHE_DIR
+    engine = engine or ENGINE
+    caminho = os.path.join(cache_dir, f"{sha}-{engine}.json")
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            print("PDF já processado anteriormente; reutilizando o resultado em cache.")
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    resultado = parse_pdf(arquivo_pdf, engine, etapas)
+    os.makedirs(cache_dir, exist_ok=True)
+    salvar_json_atomico(resultado, caminho)
+    # Mantém apenas os arquivos mais recentes
+    arquivos = sorted((os.path.join(cache_dir, n) for n in os.listdir(cache_dir) if n.endswith(".json")), key=os.path.getmtime)
+    for antigo in arquivos[:-CACHE_MAX_ARQUIVOS]:
+        os.remove(antigo)
+    return resultado
+
+def montar_dataframe(parsed: dict) -> pd.DataFrame:
+    """Normaliza as linhas extraídas e adiciona zona, período, metadados do boletim e coordenadas."""
+    periodo = parsed["periodo"]
+    dias_periodo = expand_periodo(periodo)
+    data_extracao = datetime.today().strftime("%Y-%m-%d")
+
+    df = pd.DataFrame(parsed["linhas"], columns=["Nome", "Status"])
     df["Nome"] = df["Nome"].apply(lambda x: " ".join(x.split()))
     df = df.drop_duplicates(subset=["Nome"]).reset_index(drop=True)
 
     df["Zona"] = df["Nome"].apply(classify_zona)
     df["Periodo"] = periodo
     df["Dias_Periodo"] = [", ".join(dias_periodo)] * len(df)
-    df["Numero_Boletim"] = numero_boletim
-    df["Tipos_Amostragem"] = tipos_amostragem
+    df["Numero_Boletim"] = parsed["numero_boletim"]
+    df["Tipos_Amostragem"] = parsed["tipos_amostragem"]
     df["Data_Extração"] = data_extracao
     df["Status"] = df["Status"].map({"P": "Própria para banho", "I": "Imprópria para banho"})
     df.insert(0, "id", range(1, len(df) + 1))
     df["Coordenadas"] = df["Nome"].apply(lambda n: COORDENADAS_POR_CODIGO.get(extract_point_code(n), None))
+    return df
+
+def salvar_csv(df: pd.DataFrame, caminho_csv: str):
+    # Escreve em um arquivo temporário e troca de uma vez, para que a API nunca leia um CSV pela metade
+    caminho_tmp = f"{caminho_csv}.{os.getpid()}.tmp"
+    df.to_csv(caminho_tmp, index=False, encoding="utf-8")
+    os.replace(caminho_tmp, caminho_csv)
+
+def arquivar_boletim(registros):
+    """Grava o boletim no histórico (sem efeito se ele já estiver lá); uma falha só é registrada no log."""
+    try:
+        historico.registrar_boletim(registros)
+    except Exception as e:
+        print(f"AVISO: Falha ao gravar o boletim no histórico: {e}")
+
+def arquivar_csv(caminho_csv: str):
+    """Arquiva o boletim do CSV existente, para que o histórico cubra também o boletim em vigor."""
+    try:
+        registros = carregar_praias(caminho_csv)
+    except (OSError, ValueError) as e:
+        print(f"AVISO: Falha ao ler {caminho_csv} para o histórico: {e}")
+        return
+    arquivar_boletim(registros)
+
+def run_scraper(forcar: bool = False) -> dict:
+    """Atualiza o CSV com o último boletim da SEMACE.
+
+    Antes de baixar e processar o PDF, usa ETag/Last-Modified (da página e do PDF)
+    e o hash do conteúdo para detectar um boletim inalterado; nesse caso nada é
+    reprocessado. Devolve um relatório com a chave "alterado" (False = execução sem
+    efeito) e a duração de cada etapa em "etapas".
+    """
+    print("Iniciando o processo de scraping...")
+    estado = {} if forcar else carregar_estado()
+    csv_existe = os.path.exists(CAMINHO_CSV)
+    etapas = {}
+    relatorio = {"alterado": False, "etapas": etapas}
+
+    with medir_etapa(etapas, "download"):
+        ultimo_boletim_url, validadores_pagina = encontrar_boletim_url(estado)
+    if ultimo_boletim_url is None and csv_existe:
+        arquivar_csv(CAMINHO_CSV)
+        print("Página de boletins inalterada; nada a fazer.")
+        return {**relatorio, "motivo": "pagina_nao_modificada", "url": estado.get("url")}
+    if ultimo_boletim_url is None:
+        # Página não mudou, mas o CSV sumiu: busca a página por completo
+        estado.pop("pagina", None)
+        with medir_etapa(etapas, "download"):
+            ultimo_boletim_url, validadores_pagina = encontrar_boletim_url(estado)
+    relatorio["url"] = ultimo_boletim_url
+
+    with medir_etapa(etapas, "download"):
+        sha, validadores_pdf = baixar_pdf(ultimo_boletim_url, ARQUIVO_PDF, estado)
+    if sha is None:
+        sha = estado.get("sha256")
+    novo_estado = {"url": ultimo_boletim_url, "pagina": validadores_pagina, "pdf": validadores_pdf, "sha256": sha}
+    relatorio["sha256"] = sha
+
+    if sha is not None and sha == estado.get("sha256") and csv_existe:
+        salvar_json_atomico(novo_estado, ESTADO_FILE)
+        arquivar_csv(CAMINHO_CSV)
+        print("Boletim inalterado; nada a fazer.")
+        return {**relatorio, "motivo": "boletim_inalterado"}
+    if sha is None:
+        # 304 sem hash conhecido: não há como reaproveitar, baixa de novo sem validadores
+        with medir_etapa(etapas, "download"):
+            sha, validadores_pdf = baixar_pdf(ultimo_boletim_url, ARQUIVO_PDF, {})
+        novo_estado.update({"pdf": validadores_pdf, "sha256": sha})
+        relatorio["sha256"] = sha
 
-    BASE_DIR = os.path.dirname(SRC_DIR)
-    caminho_csv = os.path.join(BASE_DIR, "boletim_fortaleza.csv")
-    df.to_csv(caminho_csv, index=False, encoding="utf-8")
-    print(f"Scraping concluído. CSV salvo em: {caminho_csv}")
+    parsed = parse_pdf_com_cache(ARQUIVO_PDF, sha, etapas=etapas)
+    with medir_etapa(etapas, "montar_dataframe"):
+        df = montar_dataframe(parsed)
+    if csv_existe:
+        # O boletim que será substituído também fica no histórico
+        arquivar_csv(CAMINHO_CSV)
+    with medir_etapa(etapas, "salvar_csv"):
+        salvar_csv(df, CAMINHO_CSV)
+    arquivar_boletim(df.to_dict(orient="records"))
+    salvar_json_atomico(novo_estado, ESTADO_FILE)
+    print(f"Scraping concluído. CSV salvo em: {CAMINHO_CSV}")
+    return {**relatorio, "alterado": True, "motivo": "boletim_novo", "linhas": len(df)}
 
-# Bloco para permitir que o script seja executado de forma independente para testes
+# Ponto de entrada da ingestão: `python -m src.scraper`. A API o executa em um
+# subprocesso (ver ingestao.py), com --relatorio para receber o relatório em JSON.
 if __name__ == "__main__":
-    run_scraper()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Atualiza o CSV com o último boletim da SEMACE.")
+    parser.add_argument("--forcar", action="store_true", help="ignora ETag/Last-Modified e o hash do último boletim")
+    parser.add_argument("--relatorio", action="store_true", help="imprime o relatório em JSON na última linha")
+    args = parser.parse_args()
+    relatorio = run_scraper(forcar=args.forcar)
+    if args.relatorio:
+        print(json.dumps(relatorio, ensure_ascii=False))
@@ -0,0 +1,126 @@
+# src/snapshot.py
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+# --- Localização dos snapshots (fora da árvore do projeto) ---
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "balneabilidade-snapshots"))
+
+# --- Formato do arquivo ---
+# Cabeçalho fixo, seguido da tabela de campos pré-calculados (um registro de
+# tamanho fixo por praia, lido como array estruturado do NumPy direto do mmap),
+# do vocabulário das chaves de busca (JSON) e do blob com o JSON de cada praia.
+MAGICO = b"PRAIASNP"
+VERSAO_FORMATO = 1
+# mágico, formato, nº de praias, offset e tamanho do vocabulário, offset e tamanho do blob,
+# versão do CSV de origem (ino, mtime_ns, tamanho)
+CABECALHO = struct.Struct("<8sIIQQQQQQQ")
+# Chaves de busca: na tabela fica a posição do valor na lista correspondente do vocabulário
+CHAVES = ("id", "codigo", "zona", "status")
+DTYPE = np.dtype([
+    ("id", "<u4"),
+    ("codigo", "<u4"),
+    ("zona", "<u4"),
+    ("status", "<u4"),
+    ("lat", "<f8"),      # NaN se não houver coordenadas
+    ("lon", "<f8"),
+    ("inicio", "<i4"),   # período do boletim em ordinais de date; 0 se desconhecido
+    ("fim", "<i4"),
+    ("offset", "<u8"),   # posição do JSON da praia dentro do blob
+    ("tamanho", "<u8"),
+])
+SEM_ORIGEM = (0, 0, 0)
+
+
+def caminho_do_snapshot(caminho_csv, diretorio=None):
+    """Caminho do snapshot de um CSV em SNAPSHOT_DIR, com o nome derivado do caminho absoluto do CSV."""
+    nome = hashlib.sha1(os.path.abspath(caminho_csv).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(diretorio or SNAPSHOT_DIR, f"{nome}.snapshot")
+
+
+def montar_snapshot(registros, chaves, coordenadas, periodos, origem=SEM_ORIGEM):
+    """Serializa as praias no formato do snapshot e devolve os bytes do arquivo.
+
+    `chaves` (dicts com as CHAVES), `coordenadas` e `periodos` são alinhados com
+    `registros` (None quando não houver); `origem` é a versão do CSV de origem.
+    """
+    vocabulario = {chave: {} for chave in CHAVES}
+    tabela = np.zeros(len(registros), dtype=DTYPE)
+    blob = bytearray()
+    for i, (registro, valores, coords, periodo) in enumerate(zip(registros, chaves, coordenadas, periodos)):
+        posicoes = [vocabulario[c].setdefault(valores[c], len(vocabulario[c])) for c in CHAVES]
+        corpo = json.dumps(registro, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        tabela[i] = (
+            *posicoes,
+            coords[0] if coords else np.nan,
+            coords[1] if coords else np.nan,
+            periodo[0].toordinal() if periodo else 0,
+            periodo[1].toordinal() if periodo else 0,
+            len(blob),
+            len(corpo),
+        )
+        blob += corpo
+    vocabulario = json.dumps({c: list(v) for c, v in vocabulario.items()}, ensure_ascii=False).encode("utf-8")
+    offset_vocabulario = CABECALHO.size + tabela.nbytes
+    offset_blob = offset_vocabulario + len(vocabulario)
+    cabecalho = CABECALHO.pack(MAGICO, VERSAO_FORMATO, len(tabela), offset_vocabulario, len(vocabulario),
+                               offset_blob, len(blob), *origem)
+    return b"".join((cabecalho, tabela.tobytes(), vocabulario, bytes(blob)))
+
+
+def escrever_snapshot(dados, caminho):
+    """Grava o snapshot de forma atômica (arquivo temporário + os.replace)."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(caminho_tmp, "wb") as f:
+        f.write(dados)
+    os.replace(caminho_tmp, caminho)
+
+
+class Snapshot:
+    """Snapshot do boletim sobre um buffer: o mapeamento do arquivo (somente leitura) ou bytes em memória.
+
+    A tabela é uma visão do buffer, sem cópia; com o arquivo mapeado, suas páginas
+    ficam no page cache e são compartilhadas por todos os workers (com
+    `gunicorn --preload`, o mapeamento do processo mestre é herdado no fork).
+    Trocar o arquivo (os.replace) não afeta quem ainda usa o mapeamento antigo.
+    """
+
+    def __init__(self, buffer):
+        if len(buffer) < CABECALHO.size:
+            raise ValueError("Snapshot truncado")
+        (magico, formato, total, offset_vocabulario, tamanho_vocabulario,
+         self._offset_blob, tamanho_blob, *origem) = CABECALHO.unpack_from(buffer, 0)
+        if magico != MAGICO or formato != VERSAO_FORMATO:
+            raise ValueError("Snapshot em formato desconhecido")
+        if (offset_vocabulario != CABECALHO.size + total * DTYPE.itemsize
+                or self._offset_blob != offset_vocabulario + tamanho_vocabulario
+                or self._offset_blob + tamanho_blob != len(buffer)):
+            raise ValueError("Snapshot truncado")
+        self._buffer = buffer
+        self.origem = tuple(origem)
+        self.tabela = np.frombuffer(buffer, dtype=DTYPE, count=total, offset=CABECALHO.size)
+        self.vocabulario = json.loads(bytes(buffer[offset_vocabulario:self._offset_blob]))
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def registro(self, i):
+        """Decodifica o JSON da praia na posição i."""
+        inicio = self._offset_blob + int(self.tabela["offset"][i])
+        return json.loads(self._buffer[inicio:inicio + int(self.tabela["tamanho"][i])])
+
+
+def abrir_snapshot(caminho):
+    """Mapeia o snapshot em memória (somente leitura), ou devolve None se ele não existir ou for inválido."""
+    try:
+        with open(caminho, "rb") as f:
+            return Snapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError, struct.error):
+        return None
@@ -0,0 +1,193 @@
+# src/store.py
+
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+from .coordenadas import COORDENADAS_POR_CODIGO
+from .snapshot import SEM_ORIGEM, Snapshot, montar_snapshot
+
+
+def extrair_codigo(praia):
+    return (str(praia.get("Nome") or "")[:3] or "").strip().upper()
+
+
+def parse_coordenadas(texto):
+    """Converte "lat, lon" (formato de COORDENADAS_POR_CODIGO) em uma tupla de floats."""
+    lat_str, lon_str = texto.split(", ")
+    return float(lat_str), float(lon_str)
+
+
+def parse_data(data):
+    """Converte uma data YYYY-MM-DD em date; devolve None se o formato for inválido."""
+    try:
+        return datetime.strptime(str(data), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def parse_periodo(praia):
+    """Extrai o intervalo (início, fim) do boletim a partir de Periodo ("dd/mm/aaaa a dd/mm/aaaa") ou de Dias_Periodo."""
+    periodo = praia.get("Periodo")
+    if isinstance(periodo, str) and " a " in periodo:
+        try:
+            inicio_str, fim_str = [p.strip() for p in periodo.split(" a ")]
+            return (datetime.strptime(inicio_str, "%d/%m/%Y").date(),
+                    datetime.strptime(fim_str, "%d/%m/%Y").date())
+        except ValueError:
+            pass
+    dias = praia.get("Dias_Periodo")
+    if isinstance(dias, str) and dias:
+        datas = [d for d in (parse_data(x.strip()) for x in dias.split(",")) if d]
+        if datas:
+            return min(datas), max(datas)
+    return None
+
+
+# Raio médio da Terra, em km
+RAIO_TERRA_KM = 6371.0088
+
+
+def haversine_km(lat, lon, lats_rad, lons_rad, cos_lats):
+    """Distâncias (km) de (lat, lon), em graus, a vários pontos já convertidos para radianos, de uma vez."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    a = np.sin((lats_rad - lat1) / 2) ** 2 + np.cos(lat1) * cos_lats * np.sin((lons_rad - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# Coordenadas convertidas para float uma única vez
+COORDENADAS = {codigo: parse_coordenadas(texto) for codigo, texto in COORDENADAS_POR_CODIGO.items()}
+
+
+def snapshot_de_registros(registros, origem=SEM_ORIGEM):
+    """Monta o snapshot (bytes, ver snapshot.py) das praias, com coordenadas e períodos já calculados."""
+    registros = list(registros)
+    codigos = [extrair_codigo(p) for p in registros]
+    chaves = [{"id": p.get("id"), "codigo": c, "zona": p.get("Zona"), "status": p.get("Status")}
+              for p, c in zip(registros, codigos)]
+    return montar_snapshot(registros, chaves, [COORDENADAS.get(c) for c in codigos],
+                           [parse_periodo(p) for p in registros], origem)
+
+
+class PraiaStore:
+    """Conjunto imutável de praias de um boletim, servido a partir de um snapshot (ver snapshot.py).
+
+    Oferece busca por id, zona, status e código do ponto em O(1), coordenadas já
+    convertidas para float e o período do boletim como intervalo de datas. Os
+    índices, as coordenadas e os períodos vêm da tabela do snapshot; o registro
+    de cada praia só é decodificado do JSON quando é pedido pela primeira vez.
+    Sem `snapshot`, os `registros` são serializados num snapshot em memória. Os
+    registros devolvidos são compartilhados entre requisições e não devem ser
+    modificados.
+    """
+
+    def __init__(self, registros=(), snapshot=None):
+        self._snapshot = snapshot if snapshot is not None else Snapshot(snapshot_de_registros(registros))
+        self._tabela = self._snapshot.tabela
+        self._registros = [None] * len(self._tabela)
+        self._lock = threading.Lock()
+        self._resumo = None
+        self._por_id = {k: v[0] for k, v in self._agrupar("id").items()}
+        self._por_codigo = {k: v[0] for k, v in self._agrupar("codigo").items()}
+        self._por_zona = self._agrupar("zona")
+        self._por_status = self._agrupar("status")
+        # Praias com coordenadas e seus pontos em radianos, para consultas espaciais vetorizadas
+        com_coordenadas = ~np.isnan(self._tabela["lat"])
+        self._com_coordenadas = np.flatnonzero(com_coordenadas)
+        self._lats_rad = np.radians(self._tabela["lat"][com_coordenadas])
+        self._lons_rad = np.radians(self._tabela["lon"][com_coordenadas])
+        self._cos_lats = np.cos(self._lats_rad)
+
+    def _agrupar(self, chave):
+        """{valor da chave: posições das praias com esse valor}, a partir da coluna da tabela."""
+        valores = self._snapshot.vocabulario[chave]
+        grupos = {}
+        for i, v in enumerate(self._tabela[chave].tolist()):
+            grupos.setdefault(valores[v], []).append(i)
+        return {k: tuple(v) for k, v in grupos.items()}
+
+    def _registro(self, i):
+        registro = self._registros[i]
+        if registro is None:
+            with self._lock:
+                registro = self._registros[i]
+                if registro is None:
+                    registro = self._snapshot.registro(i)
+                    self._registros[i] = registro
+        return registro
+
+    def _posicao(self, praia):
+        """Posição da praia na tabela pelo código do ponto, que a identifica entre cópias, boletins e recargas."""
+        codigo = extrair_codigo(praia)
+        return self._por_codigo.get(codigo) if codigo else None
+
+    def __iter__(self):
+        return iter(self.todas())
+
+    def __len__(self):
+        return len(self._tabela)
+
+    def todas(self):
+        return tuple(self._registro(i) for i in range(len(self)))
+
+    def resumo(self):
+        if self._resumo is None:
+            self._resumo = tuple({"id": p.get("id"), "nome": p.get("Nome"), "zona": p.get("Zona")} for p in self.todas())
+        return self._resumo
+
+    def por_id(self, id):
+        i = self._por_id.get(id)
+        return self._registro(i) if i is not None else None
+
+    def por_codigo(self, codigo):
+        i = self._por_codigo.get(codigo)
+        return self._registro(i) if i is not None else None
+
+    def por_zona(self, zona):
+        return tuple(map(self._registro, self._por_zona.get(zona, ())))
+
+    def por_status(self, status):
+        return tuple(map(self._registro, self._por_status.get(status, ())))
+
+    def coordenadas(self, praia):
+        """(lat, lon) do ponto de coleta da praia, ou None se não houver coordenadas conhecidas."""
+        i = self._posicao(praia)
+        if i is None or np.isnan(self._tabela["lat"][i]):
+            return None
+        return float(self._tabela["lat"][i]), float(self._tabela["lon"][i])
+
+    def _periodo_da_posicao(self, i):
+        inicio, fim = int(self._tabela["inicio"][i]), int(self._tabela["fim"][i])
+        return (date.fromordinal(inicio), date.fromordinal(fim)) if inicio else None
+
+    def periodo(self, praia):
+        i = self._posicao(praia)
+        return self._periodo_da_posicao(i) if i is not None else None
+
+    def periodo_boletim(self):
+        """Período (início, fim) do boletim carregado, ou None se não houver dados."""
+        com_periodo = np.flatnonzero(self._tabela["inicio"])
+        return self._periodo_da_posicao(com_periodo[0]) if len(com_periodo) else None
+
+    def cobre_data(self, praia, data):
+        """Indica se o boletim carregado vale para a data (YYYY-MM-DD) informada."""
+        periodo = self.periodo(praia)
+        dia = parse_data(data)
+        return bool(periodo and dia and periodo[0] <= dia <= periodo[1])
+
+    def proximas(self, lat, lon, raio_km=None, limite=None):
+        """Praias mais próximas de (lat, lon), como [(praia, distância em km)] em ordem de distância.
+
+        `raio_km` descarta as que estão mais longe que o raio e `limite` fica com as
+        `limite` mais próximas; os dois podem ser combinados.
+        """
+        distancias = haversine_km(lat, lon, self._lats_rad, self._lons_rad, self._cos_lats)
+        indices = np.arange(len(distancias))
+        if raio_km is not None:
+            indices = indices[distancias <= raio_km]
+        if limite is not None and limite < len(indices):
+            # Seleção parcial em O(n) antes de ordenar só os `limite` escolhidos
+            indices = indices[np.argpartition(distancias[indices], limite - 1)[:limite]]
+        indices = indices[np.argsort(distancias[indices], kind="stable")]
+        return [(self._registro(int(self._com_coordenadas[i])), float(distancias[i])) for i in indices]
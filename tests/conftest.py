@@ -1,7 +1,20 @@
-import sys, os
+import sys, os, tempfile
 import pytest
 from datetime import datetime
+from urllib.parse import parse_qs, urlparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+#nos testes o scraper nunca roda em segundo plano (evita acesso ao site da SEMACE)
+os.environ.setdefault("SCRAPER_ATUALIZACAO_AUTOMATICA", "0")
+#nem o prefetch de previsões (as chamadas à Open-Meteo são simuladas por teste)
+os.environ.setdefault("FORECAST_PREFETCH", "0")
+#balde de chamadas à Open-Meteo em arquivo temporário e sem limite prático nos testes
+os.environ.setdefault("OPEN_METEO_BUCKET_FILE", os.path.join(tempfile.mkdtemp(), "open_meteo.bucket"))
+os.environ.setdefault("OPEN_METEO_TAXA", "1000")
+os.environ.setdefault("OPEN_METEO_RAJADA", "1000")
+#histórico de boletins em um banco temporário, fora do repositório
+os.environ.setdefault("HISTORICO_DB", os.path.join(tempfile.mkdtemp(), "historico.sqlite3"))
+#e os snapshots do boletim também
+os.environ.setdefault("SNAPSHOT_DIR", tempfile.mkdtemp())
 from src.app import app
 
 # --- Fixture ---
@@ -51,10 +64,44 @@ def mock_requests_get(mocker):
     }
 
     #patch: toda vez que requests.get for chamado, decide qual mock usar
+    #com vários pontos (latitude=a,b,...) a Open-Meteo responde uma lista, um item por ponto
     def fake_requests_get(url, *args, **kwargs):
-        if "marine-api.open-meteo.com" in url:
-            return mock_marine
-        return mock_weather
+        mock = mock_marine if "marine-api.open-meteo.com" in url else mock_weather
+        latitudes = parse_qs(urlparse(url).query).get("latitude", [""])[0].split(",")
+        if len(latitudes) == 1:
+            return mock
+        mock_lote = mocker.Mock()
+        mock_lote.status_code = 200
+        mock_lote.json.return_value = [mock.json.return_value for _ in latitudes]
+        return mock_lote
 
     mocker.patch("requests.get", side_effect=fake_requests_get)
+    #o cliente de previsão usa uma requests.Session (conexões reaproveitadas)
+    mocker.patch("requests.Session.get", side_effect=fake_requests_get)
     return mock_weather
+
+#limpa o cache de previsões e os nós da grade aprendidos e fecha os disjuntores entre os testes para que um teste não dependa de outro
+@pytest.fixture(autouse=True)
+def limpar_cache_previsao():
+    from src.forecast import _nos, _representantes, cache, disjuntores
+    cache.clear()
+    for aprendidos in (*_nos.values(), *_representantes.values()):
+        aprendidos.clear()
+    for disjuntor in disjuntores.values():
+        disjuntor.sucesso()
+    yield
+    cache.clear()
+    for disjuntor in disjuntores.values():
+        disjuntor.sucesso()
+
+#stub HTTP local da Open-Meteo (benchmarks/stub_open_meteo.py); desfaz os mocks de requests
+#e aponta o cliente de previsão para o stub, exercitando o caminho HTTP real sem internet
+@pytest.fixture
+def stub_open_meteo(mocker, monkeypatch):
+    from benchmarks.stub_open_meteo import StubOpenMeteo
+    from src import forecast
+    mocker.stopall()
+    with StubOpenMeteo(latencia_s=0) as stub:
+        monkeypatch.setitem(forecast.UPSTREAMS, "weather", (stub.url_weather, forecast.WEATHER_VARS))
+        monkeypatch.setitem(forecast.UPSTREAMS, "marine", (stub.url_marine, forecast.MARINE_VARS))
+        yield stub
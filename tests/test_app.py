@@ -55,4 +55,188 @@ def test_filtrar_por_status_propria(client):
 def test_filtrar_por_zona_leste(client):
     hoje = datetime.today().strftime("%Y-%m-%d")
     response = client.get(f"/praias/zona/Leste?data={hoje}")
-    assert response.status_code in (200, 404)    
\ No newline at end of file
+    assert response.status_code in (200, 404)
+
+#Testa que o filtro por zona com data faz apenas uma chamada de tempo e uma de mar
+def test_filtrar_por_zona_previsao_em_lote(client):
+    import requests
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    response = client.get(f"/praias/zona/Oeste?data={hoje}")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data) > 1
+    assert all(item["previsao"]["temperatura_c"] == 28 for item in data)
+    assert requests.Session.get.call_count == 2
+
+#Testa que datas inválidas não chegam à Open-Meteo e que datas fora da janela dela não gastam chamadas
+def test_data_validada_antes_da_open_meteo(client):
+    import requests
+    from datetime import timedelta
+    for rota in ("/praias/1/data?", "/praias/zona/Oeste?", "/praias/status/propria?", "/praias/proximas?lat=-3.72&lon=-38.50&"):
+        assert client.get(f"{rota}data=garbage").status_code == 400
+    assert requests.Session.get.call_count == 0
+
+    distante = (datetime.today() + timedelta(days=400)).strftime("%Y-%m-%d")
+    response = client.get(f"/praias/1/data?data={distante}")
+    assert response.status_code == 200
+    assert json.loads(response.data)["previsao"]["mensagem"].startswith("Previsão não disponível")
+    assert requests.Session.get.call_count == 0
+
+#Testa que a data sem zeros à esquerda é normalizada e reaproveita o cache da data normalizada
+def test_data_normalizada_usa_o_cache(client):
+    import requests
+    hoje = datetime.today()
+    assert client.get(f"/praias/1/data?data={hoje:%Y-%m-%d}").status_code == 200
+    chamadas = requests.Session.get.call_count
+    response = client.get(f"/praias/1/data?data={hoje.year}-{hoje.month}-{hoje.day}")
+    assert json.loads(response.data)["previsao"]["temperatura_c"] == 28
+    assert requests.Session.get.call_count == chamadas
+
+#Testa que uma data fora do boletim atual é respondida pelo histórico de boletins
+def test_buscar_praia_por_id_e_data_historico(client):
+    from src.app import dataset
+    from src.historico import historico
+    praia = dict(dataset.atual().por_id(1))
+    praia.update({"Periodo": "01/01/2024 a 07/01/2024", "Numero_Boletim": "202401011-BOL", "Status": "Imprópria para banho"})
+    historico.registrar_boletim([praia])
+    response = client.get("/praias/1/data?data=2024-01-03")
+    data = json.loads(response.data)
+    assert data["boletim"]["Numero_Boletim"] == "202401011-BOL"
+    assert data["boletim"]["Status"] == "Imprópria para banho"
+    response = client.get("/praias/1/data?data=2023-12-31")
+    assert json.loads(response.data)["boletim"].startswith("Não há boletim")
+
+#Testa ETag, 304 com If-None-Match e Cache-Control nas rotas que só mudam com o boletim
+def test_listar_praias_etag_304(client):
+    response = client.get("/praias")
+    etag = response.headers["ETag"]
+    assert "max-age" in response.headers["Cache-Control"]
+    response = client.get("/praias", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+#Testa a compressão gzip negociada e a saída indentada sob demanda
+def test_listar_praias_gzip_e_pretty(client):
+    import gzip
+    compacto = client.get("/praias").data
+    response = client.get("/praias", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == compacto
+    indentado = client.get("/praias?pretty=1").data
+    assert json.loads(indentado) == json.loads(compacto)
+    assert len(indentado) > len(compacto)
+
+#Testa a exposição das métricas por rota, da Open-Meteo e dos caches em /metrics
+def test_metrics(client):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    client.get("/praias")
+    client.get(f"/praias/1/data?data={hoje}")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    texto = response.data.decode("utf-8")
+    pid = f'pid="{os.getpid()}"'
+    assert f'api_http_requisicoes_total{{{pid},rota="/praias",metodo="GET",status="200"}}' in texto
+    assert f'api_http_latencia_segundos_bucket{{{pid},rota="/praias/<int:id>/data",metodo="GET",status="200",le="+Inf"}}' in texto
+    assert f'api_upstream_latencia_segundos_count{{{pid},upstream="marine"}}' in texto
+    assert "# TYPE api_cache_previsao_hits_total counter" in texto
+    assert f"api_cache_respostas_misses_total{{{pid}}}" in texto
+    assert "# TYPE api_cache_previsao_hit_ratio gauge" in texto
+    assert "api_boletim_idade_segundos" in texto
+
+#Testa a previsão de vários dias com uma chamada de tempo e uma de mar, séries em colunas e status do boletim
+def test_previsao_por_intervalo(client, stub_open_meteo):
+    from datetime import timedelta
+    hoje = datetime.today().date()
+    fim = hoje + timedelta(days=6)
+    response = client.get(f"/praias/1/previsao?inicio={hoje}&fim={fim}&passo=3")
+    assert response.status_code == 200
+    series = json.loads(response.data)["series"]
+    assert len(series["tempo"]) == 7 * 8
+    assert series["tempo"][:2] == [f"{hoje}T00:00", f"{hoje}T03:00"]
+    assert len(series["temperatura_c"]) == len(series["altura_ondas_m"]) == len(series["status_boletim"]) == 56
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 1, "/v1/marine": 1}
+    #qualquer subintervalo já está no cache
+    response = client.get(f"/praias/1/previsao?inicio={hoje}&horas=09:00,15:00")
+    assert json.loads(response.data)["series"]["tempo"] == [f"{hoje}T09:00", f"{hoje}T15:00"]
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 1, "/v1/marine": 1}
+
+#Testa que datas sem zeros à esquerda são aceitas e normalizadas na previsão por intervalo
+def test_previsao_por_intervalo_normaliza_datas(client, stub_open_meteo):
+    response = client.get("/praias/1/previsao?inicio=2026-11-1&fim=2026-11-2&passo=12")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert (data["inicio"], data["fim"]) == ("2026-11-01", "2026-11-02")
+    assert data["series"]["tempo"] == ["2026-11-01T00:00", "2026-11-01T12:00", "2026-11-02T00:00", "2026-11-02T12:00"]
+
+#Testa a validação dos parâmetros da previsão por intervalo
+def test_previsao_por_intervalo_invalida(client):
+    assert client.get("/praias/1/previsao").status_code == 400
+    assert client.get("/praias/1/previsao?inicio=2025-01-10&fim=2025-01-01").status_code == 400
+    assert client.get("/praias/1/previsao?inicio=2025-01-01&fim=2025-03-01").status_code == 400
+    assert client.get("/praias/1/previsao?inicio=2025-01-01&passo=0").status_code == 400
+    assert client.get("/praias/1/previsao?inicio=2025-01-01&horas=09:30").status_code == 400
+    assert client.get("/praias/9999/previsao?inicio=2025-01-01").status_code == 404
+
+#Testa a rota de praias próximas, com previsão opcional
+def test_praias_proximas(client):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    response = client.get("/praias/proximas?lat=-3.72&lon=-38.50")
+    data = json.loads(response.data)
+    assert response.status_code == 200
+    assert len(data) == 5
+    assert data[0]["distancia_km"] <= data[-1]["distancia_km"]
+    response = client.get(f"/praias/proximas?lat=-3.72&lon=-38.50&raio=3&limite=2&data={hoje}")
+    data = json.loads(response.data)
+    assert len(data) <= 2
+    assert all(item["distancia_km"] <= 3 and item["previsao"]["temperatura_c"] == 28 for item in data)
+    assert client.get("/praias/proximas?lat=abc&lon=-38.5").status_code == 400
+    assert client.get("/praias/proximas?lat=-3.7&lon=-38.5&limite=0").status_code == 400
+
+#Testa o lote de consultas: uma chamada por upstream para o mesmo dia e erros por item
+def test_previsao_em_lote(client):
+    import requests
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    itens = [{"id": 1, "data": hoje, "hora": "12:00"}, {"id": 2, "data": hoje}, {"id": 1, "data": hoje, "hora": "12:00"},
+             {"id": 9999, "data": hoje}, {"id": 3, "data": "ontem"}, {"id": 3, "data": hoje, "hora": "25h"},
+             {"id": [1], "data": hoje}, {"id": {"a": 1}, "data": hoje}, {"id": True, "data": hoje}, "texto"]
+    response = client.post("/praias/previsao/lote", json={"itens": itens})
+    assert response.status_code == 200
+    resultados = json.loads(response.data)["resultados"]
+    assert len(resultados) == len(itens)
+    assert all(r["previsao"]["temperatura_c"] == 28 for r in resultados[:3])
+    assert all("erro" in r for r in resultados[3:])
+    assert requests.Session.get.call_count == 2
+    assert client.post("/praias/previsao/lote", json={"id": 1}).status_code == 400
+
+#Testa que datas e horas sem zeros à esquerda no lote são normalizadas e recebem previsão
+def test_previsao_em_lote_normaliza_data_e_hora(client, stub_open_meteo):
+    from datetime import date
+    hoje = date.today()
+    itens = [{"id": 1, "data": f"{hoje.year}-{hoje.month}-{hoje.day}", "hora": "9:00"}, {"id": 2, "data": hoje.isoformat()}]
+    resultados = json.loads(client.post("/praias/previsao/lote", json={"itens": itens}).data)["resultados"]
+    assert all(r["previsao"]["mensagem"] == "Previsão obtida com sucesso" for r in resultados)
+    assert (resultados[0]["previsao"]["data"], resultados[0]["previsao"]["hora_consulta"]) == (hoje.isoformat(), "09:00")
+
+#Testa o modo NDJSON dos filtros com data, por query e pelo cabeçalho Accept
+def test_filtrar_por_zona_ndjson(client):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    completo = json.loads(client.get(f"/praias/zona/Leste?data={hoje}").data)
+    response = client.get(f"/praias/zona/Leste?data={hoje}&stream=1")
+    assert response.mimetype == "application/x-ndjson"
+    linhas = [json.loads(l) for l in response.data.decode("utf-8").splitlines()]
+    assert sorted(l["praia"]["id"] for l in linhas) == sorted(i["praia"]["id"] for i in completo)
+    assert all(l["previsao"]["temperatura_c"] == 28 for l in linhas)
+    response = client.get(f"/praias/status/propria?data={hoje}", headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert all("previsao" in json.loads(l) for l in response.data.decode("utf-8").splitlines())
+
+#Testa que o worker da API não carrega as bibliotecas da ingestão (pandas, pdfplumber, camelot/OpenCV)
+#(o numpy fica de fora da lista: é usado pelo PraiaStore nas consultas espaciais, ver docs)
+def test_app_sem_dependencias_da_ingestao():
+    import subprocess
+    codigo = "import sys, src.app; print(sorted(m for m in ('pandas', 'pdfplumber', 'camelot', 'cv2', 'bs4') if m in sys.modules))"
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, SCRAPER_ATUALIZACAO_AUTOMATICA="0", FORECAST_PREFETCH="0")
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=raiz, env=env, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == "[]"
@@ -0,0 +1,199 @@
+import threading
+import time
+import requests
+from datetime import datetime
+from src.forecast import ForecastCache, cache, client, get_forecast, get_forecasts
+
+#Testa que duas horas do mesmo ponto/dia geram apenas uma ida à Open-Meteo por upstream
+def test_get_forecast_reutiliza_cache(mock_requests_get):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    primeira = get_forecast(-3.7, -38.5, hoje, "12:00")
+    segunda = get_forecast(-3.7, -38.5, hoje, "13:00")
+    assert primeira["temperatura_c"] == 28
+    assert primeira["altura_ondas_m"] == 1.2
+    assert segunda["mensagem"].startswith("Previsão não disponível")
+    assert requests.Session.get.call_count == 2
+    assert cache.stats()["hits"] == 2
+
+#Testa que entradas expiradas não são devolvidas
+def test_cache_expira_por_ttl():
+    agora = [0.0]
+    c = ForecastCache(ttl=10, max_entries=4, clock=lambda: agora[0], stale_ttl=0)
+    c.set("k", {"time": []})
+    assert c.lookup("k") == ({"time": []}, True)
+    agora[0] = 11
+    assert c.lookup("k") == (None, False)
+    assert c.ultimo_valido("k") == {"time": []}
+    assert c.stats()["misses"] == 1
+
+#Testa que o cache respeita o limite de tamanho descartando o menos usado
+def test_cache_limite_de_tamanho():
+    c = ForecastCache(ttl=60, max_entries=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.lookup("a")
+    c.set("c", 3)
+    assert c.lookup("b") == (None, False)
+    assert c.lookup("a") == (1, True) and c.lookup("c") == (3, True)
+
+#Testa que vários pontos são resolvidos com uma chamada de tempo e uma de mar
+def test_get_forecasts_em_lote(mock_requests_get):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    pontos = [(-3.70, -38.50), (-3.71, -38.51), (-3.72, -38.52)]
+    previsoes = get_forecasts(pontos, hoje, "12:00")
+    assert requests.Session.get.call_count == 2
+    assert all(previsoes[p]["temperatura_c"] == 28 for p in pontos)
+    #segunda consulta dos mesmos pontos sai inteira do cache
+    get_forecasts(pontos, hoje, "12:00")
+    assert requests.Session.get.call_count == 2
+
+#Testa que as chamadas de tempo e mar são feitas em paralelo e com timeout
+def test_get_forecasts_paralelo_com_timeout(mock_requests_get):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    barreira = threading.Barrier(2, timeout=2)
+    fake = requests.Session.get.side_effect
+
+    #cada chamada só prossegue quando a outra também estiver em andamento
+    def chamada_concorrente(url, *args, **kwargs):
+        barreira.wait()
+        return fake(url, *args, **kwargs)
+
+    requests.Session.get.side_effect = chamada_concorrente
+    previsao = get_forecast(-3.7, -38.5, hoje, "12:00")
+    assert previsao["temperatura_c"] == 28
+    assert previsao["altura_ondas_m"] == 1.2
+    assert all(c.kwargs["timeout"] == client.timeout for c in requests.Session.get.call_args_list)
+
+#Testa o cliente HTTP real contra o stub local, com vários pontos numa só chamada por upstream
+def test_get_forecasts_contra_stub(stub_open_meteo):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    pontos = [(-3.70, -38.50), (-3.80, -38.40)]
+    previsoes = get_forecasts(pontos, hoje, "15:00")
+    assert all(p["mensagem"] == "Previsão obtida com sucesso" for p in previsoes.values())
+    assert previsoes[pontos[0]]["temperatura_c"] != previsoes[pontos[1]]["temperatura_c"]
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 1, "/v1/marine": 1}
+
+#Testa que, depois do TTL, a entrada ainda é devolvida como vencida até o fim da janela stale
+def test_cache_stale_while_revalidate():
+    agora = [0.0]
+    c = ForecastCache(ttl=10, max_entries=4, clock=lambda: agora[0], stale_ttl=20)
+    c.set("k", 1)
+    assert c.lookup("k") == (1, True)
+    agora[0] = 15
+    assert c.lookup("k") == (1, False)
+    agora[0] = 31
+    assert c.lookup("k") == (None, False)
+    assert c.stats()["stale_hits"] == 1
+
+#Testa que uma entrada vencida é servida na hora e revalidada em segundo plano
+def test_get_forecast_serve_vencido_e_revalida(mock_requests_get, monkeypatch):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    get_forecast(-3.7, -38.5, hoje, "12:00")
+    assert requests.Session.get.call_count == 2
+    relogio = cache._clock
+    monkeypatch.setattr(cache, "_clock", lambda: relogio() + cache.ttl + 1)
+    previsao = get_forecast(-3.7, -38.5, hoje, "12:00")
+    assert previsao["temperatura_c"] == 28
+    assert cache.stats()["stale_hits"] == 2
+    limite = time.monotonic() + 2
+    while requests.Session.get.call_count < 4 and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert requests.Session.get.call_count == 4
+
+#Testa que o prefetch busca todos os pontos e dias com uma chamada por upstream e aquece o cache
+def test_prefetch_aquece_cache(stub_open_meteo):
+    from datetime import timedelta
+    from src.prefetch import Prefetcher, hoje_local, pontos_conhecidos, prefetch
+    pontos = pontos_conhecidos()
+    assert Prefetcher(prefetch).executar() == 0
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 1, "/v1/marine": 1}
+    daqui_a_6 = (hoje_local() + timedelta(days=6)).isoformat()
+    previsoes = get_forecasts(pontos, daqui_a_6, "09:00")
+    assert all(p["mensagem"] == "Previsão obtida com sucesso" for p in previsoes.values())
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 1, "/v1/marine": 1}
+
+#Testa que as séries do intervalo cobrem as horas de qualquer upstream, com None onde um deles não tiver dado
+def test_get_forecast_range_une_horas_dos_upstreams(monkeypatch):
+    from src import forecast
+    blocos = {
+        "weather": {"2025-01-01": {"time": ["2025-01-01T00:00", "2025-01-01T01:00"], "temperature_2m": [27, 26]}},
+        "marine": {"2025-01-01": {"time": ["2025-01-01T01:00", "2025-01-01T02:00"], "wave_height": [1.1, 1.3], "desatualizado": True},
+                   "2025-01-02": {"time": ["2025-01-02T00:00"], "wave_height": [1.4]}},
+    }
+    monkeypatch.setattr(forecast, "fetch_range", lambda lat, lon, inicio, fim: blocos)
+    series = forecast.get_forecast_range(-3.7, -38.5, "2025-01-01", "2025-01-02")
+    assert series["tempo"] == ["2025-01-01T00:00", "2025-01-01T01:00", "2025-01-01T02:00", "2025-01-02T00:00"]
+    assert series["temperatura_c"] == [27, 26, None, None]
+    assert series["altura_ondas_m"] == [None, 1.1, 1.3, 1.4]
+    assert series["desatualizado"] == [False, True, True, False]
+
+#Testa que, no lote, uma data que a Open-Meteo recusa não tira a previsão dos demais itens
+def test_get_forecasts_lote_isola_data_invalida(stub_open_meteo):
+    from src.forecast import get_forecasts_lote
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    previsoes = get_forecasts_lote([(-3.70, -38.50, hoje, "12:00"), (-3.80, -38.40, "2026-11-1", "12:00"),
+                                    (-3.80, -38.40, hoje, "15:00")])
+    assert [p["mensagem"] for p in previsoes] == ["Previsão obtida com sucesso", "Previsão não disponível para 2026-11-1 às 12:00",
+                                                  "Previsão obtida com sucesso"]
+
+#Testa que, no streaming, um bloco que falha não interrompe a saída: cada ponto ainda recebe sua previsão
+def test_iter_forecasts_sobrevive_a_bloco_com_erro(mock_requests_get, monkeypatch):
+    from src import forecast
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    original = forecast._fetch_safe
+
+    def falha_no_mar(pontos, data, upstream):
+        if upstream == "marine":
+            raise KeyError("hourly")
+        return original(pontos, data, upstream)
+
+    monkeypatch.setattr(forecast, "_fetch_safe", falha_no_mar)
+    pontos = [(-3.70, -38.50), (-3.71, -38.51)]
+    previsoes = dict(forecast.iter_forecasts(pontos, hoje, "12:00"))
+    assert set(previsoes) == set(pontos)
+    assert all(p["temperatura_c"] == 28 and "altura_ondas_m" not in p for p in previsoes.values())
+
+#Testa que o prefetch começa no dia corrente em Fortaleza, mesmo com o servidor em UTC já no dia seguinte
+def test_prefetch_usa_data_de_fortaleza(monkeypatch):
+    from datetime import datetime, timezone
+    from src import forecast, prefetch as modulo
+
+    class Relogio(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 1, 1, 1, 30, tzinfo=timezone.utc).astimezone(tz)
+
+    chamadas = []
+    monkeypatch.setattr(forecast, "datetime", Relogio)
+    monkeypatch.setattr(forecast, "fetch_range_uncached", lambda bloco, inicio, fim, upstream: chamadas.append((inicio, fim)))
+    assert modulo.prefetch(pontos=[(-3.7, -38.5)], dias=2) == 0
+    assert chamadas == [("2024-12-31", "2025-01-01")] * 2
+
+#Testa que os pontos são agrupados pelo nó da grade informado pela Open-Meteo (o stub usa o nó mais
+#próximo numa grade de 0,1° para tempo e 0,083° para mar) e que cada nó é buscado uma única vez
+def test_get_forecasts_deduplica_por_no_da_grade(stub_open_meteo):
+    from datetime import date, timedelta
+    from src.forecast import representante, representantes
+    from src.store import COORDENADAS
+    pontos = list(COORDENADAS.values())
+    hoje = date.today()
+    #na primeira busca os nós ainda são desconhecidos: todos os pontos vão à Open-Meteo
+    get_forecasts(pontos, hoje.isoformat(), "12:00")
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 1, "/v1/marine": 1}
+    assert len(representantes(pontos, "weather")) == 4
+    assert len(representantes(pontos, "marine")) == 5
+
+    def mesmo_no(a, b, upstream):
+        return representante(COORDENADAS[a], upstream) == representante(COORDENADAS[b], upstream)
+
+    assert mesmo_no("01L", "67L", "weather") and mesmo_no("06L", "24O", "weather")
+    assert not mesmo_no("01L", "05L", "weather") and not mesmo_no("05L", "06L", "weather")
+    assert mesmo_no("01L", "11L", "marine") and not mesmo_no("01L", "32L", "marine")
+    assert not mesmo_no("30O", "31O", "marine")
+
+    #pontos do mesmo nó compartilham a mesma série
+    amanha = (hoje + timedelta(days=1)).isoformat()
+    previsoes = get_forecasts(pontos, amanha, "12:00")
+    assert previsoes[COORDENADAS["01L"]]["temperatura_c"] == previsoes[COORDENADAS["67L"]]["temperatura_c"]
+    assert previsoes[COORDENADAS["01L"]]["temperatura_c"] != previsoes[COORDENADAS["05L"]]["temperatura_c"]
+    assert stub_open_meteo.chamadas == {"/v1/forecast": 2, "/v1/marine": 2}
@@ -0,0 +1,40 @@
+from src.historico import Historico
+
+def boletim(numero, periodo, status):
+    return [
+        {"id": 1, "Nome": "01L - Praia A", "Status": status, "Periodo": periodo, "Numero_Boletim": numero, "Coordenadas": float("nan")},
+        {"id": 2, "Nome": "12C - Praia B", "Status": "Própria para banho", "Periodo": periodo, "Numero_Boletim": numero},
+    ]
+
+#Testa a busca do boletim em vigor para um ponto numa data, inclusive datas passadas
+def test_historico_boletim_vigente(tmp_path):
+    h = Historico(str(tmp_path / "h.sqlite3"))
+    assert h.registrar_boletim(boletim("1-BOL", "01/09/2025 a 07/09/2025", "Imprópria para banho"))
+    assert h.registrar_boletim(boletim("2-BOL", "08/09/2025 a 14/09/2025", "Própria para banho"))
+    assert h.boletim_vigente("01L", "2025-09-03")["Status"] == "Imprópria para banho"
+    assert h.boletim_vigente("01L", "2025-09-14")["Numero_Boletim"] == "2-BOL"
+    assert h.boletim_vigente("01L", "2025-09-15") is None
+    assert h.boletim_vigente("01L", "2025-08-31") is None
+    assert h.boletim_vigente("99X", "2025-09-03") is None
+    assert h.boletim_vigente("01L", "2025-09-03")["Coordenadas"] is None
+    assert h.boletim_vigente("01L", "2025-9-3")["Numero_Boletim"] == "1-BOL"
+    assert h.boletim_vigente("01L", "2025-9-14")["Numero_Boletim"] == "2-BOL"
+    assert h.boletim_vigente("01L", "03/09/2025") is None
+
+#Testa que o mesmo boletim não é gravado duas vezes
+def test_historico_deduplica_por_numero(tmp_path):
+    h = Historico(str(tmp_path / "h.sqlite3"))
+    assert h.registrar_boletim(boletim("1-BOL", "01/09/2025 a 07/09/2025", "Própria para banho"))
+    assert not h.registrar_boletim(boletim("1-BOL", "01/09/2025 a 07/09/2025", "Imprópria para banho"))
+    assert h.numeros() == ["1-BOL"]
+    assert h.boletim_vigente("01L", "2025-09-01")["Status"] == "Própria para banho"
+
+#Testa que a leitura (caminho da API) não cria o banco enquanto a ingestão não gravar nada
+def test_historico_leitura_nao_cria_banco(tmp_path):
+    caminho = tmp_path / "h.sqlite3"
+    h = Historico(str(caminho))
+    assert h.boletim_vigente("01L", "2025-09-03") is None
+    assert h.numeros() == []
+    assert not caminho.exists()
+    Historico(str(caminho)).registrar_boletim(boletim("1-BOL", "01/09/2025 a 07/09/2025", "Própria para banho"))
+    assert h.boletim_vigente("01L", "2025-09-03")["Numero_Boletim"] == "1-BOL"
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+from src import forecast
+from src.protecao import CircuitBreaker, TokenBucket
+
+#Testa que o balde de fichas é compartilhado pelo arquivo entre instâncias (workers) e recarrega com o tempo
+def test_token_bucket_compartilhado(tmp_path):
+    agora = [1000.0]
+    caminho = str(tmp_path / "bucket")
+    worker_a = TokenBucket(taxa=1, capacidade=2, caminho=caminho, clock=lambda: agora[0])
+    worker_b = TokenBucket(taxa=1, capacidade=2, caminho=caminho, clock=lambda: agora[0])
+    assert worker_a.consumir() and worker_b.consumir()
+    assert not worker_a.consumir()
+    assert not worker_b.consumir()
+    agora[0] += 1
+    assert worker_b.consumir()
+    assert not worker_a.consumir()
+
+#Testa a abertura do disjuntor após falhas seguidas, a chamada de teste e o fechamento
+def test_circuit_breaker():
+    agora = [0.0]
+    disjuntor = CircuitBreaker(limiar=2, espera=10, clock=lambda: agora[0])
+    disjuntor.falha()
+    assert disjuntor.permitir()
+    disjuntor.falha()
+    assert not disjuntor.permitir()
+    agora[0] = 10
+    assert disjuntor.permitir()
+    assert not disjuntor.permitir()  # só uma chamada de teste por vez
+    disjuntor.falha()
+    assert not disjuntor.permitir()
+    agora[0] = 20
+    assert disjuntor.permitir()
+    disjuntor.sucesso()
+    assert disjuntor.permitir() and disjuntor.estado == CircuitBreaker.FECHADO
+
+#Testa, contra o stub com falhas injetadas, o fallback marcado como desatualizado e o circuito que para de chamar a Open-Meteo
+def test_fallback_e_circuito_contra_stub(stub_open_meteo, monkeypatch):
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    original = forecast.get_forecast(-3.7, -38.5, hoje, "15:00")
+    assert "desatualizada" not in original
+
+    #todas as entradas do cache passam da janela stale e a Open-Meteo começa a falhar
+    relogio = forecast.cache._clock
+    monkeypatch.setattr(forecast.cache, "_clock", lambda: relogio() + forecast.cache.ttl + forecast.cache.stale_ttl + 1)
+    stub_open_meteo.taxa_falha = 1
+    for _ in range(forecast.disjuntores["weather"].limiar):
+        previsao = forecast.get_forecast(-3.7, -38.5, hoje, "15:00")
+        assert previsao["desatualizada"] is True
+        assert previsao["temperatura_c"] == original["temperatura_c"]
+    assert forecast.disjuntores["weather"].estado == forecast.disjuntores["weather"].ABERTO
+
+    chamadas = dict(stub_open_meteo.chamadas)
+    inicio = time.perf_counter()
+    previsao = forecast.get_forecast(-3.7, -38.5, hoje, "15:00")
+    assert time.perf_counter() - inicio < 0.5
+    assert previsao["desatualizada"] is True
+    assert stub_open_meteo.chamadas == chamadas
+
+#Testa que uma chamada de teste recusada pelo balde não deixa o disjuntor preso em meio aberto
+def test_circuito_se_recupera_apos_teste_recusado_pelo_balde(stub_open_meteo, monkeypatch):
+    import pytest
+    from src.protecao import CircuitoAberto, LimiteDeTaxa
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    agora = [0.0]
+    disjuntor = CircuitBreaker(limiar=1, espera=10, clock=lambda: agora[0])
+    monkeypatch.setitem(forecast.disjuntores, "weather", disjuntor)
+    disjuntor.falha()
+    with pytest.raises(CircuitoAberto):
+        forecast.fetch_range_uncached([(-3.7, -38.5)], hoje, hoje, "weather")
+
+    agora[0] = 10
+    monkeypatch.setattr(forecast.limite_de_taxa, "consumir", lambda: False)
+    with pytest.raises(LimiteDeTaxa):
+        forecast.fetch_range_uncached([(-3.7, -38.5)], hoje, hoje, "weather")
+    assert disjuntor.estado == CircuitBreaker.ABERTO
+
+    #com fichas de novo, a chamada de teste vai à rede e fecha o circuito
+    monkeypatch.setattr(forecast.limite_de_taxa, "consumir", lambda: True)
+    assert forecast.fetch_range_uncached([(-3.7, -38.5)], hoje, hoje, "weather")[(-3.7, -38.5)][hoje]
+    assert disjuntor.estado == CircuitBreaker.FECHADO
+
+#Testa que um arquivo de balde inutilizável libera a chamada em vez de virar erro 500
+def test_token_bucket_arquivo_indisponivel(tmp_path):
+    bucket = TokenBucket(taxa=1, capacidade=1, caminho=str(tmp_path / "nao_existe" / "bucket"))
+    assert bucket.consumir()
+
+#Testa que uma revalidação em segundo plano que falha não conta pontos como servidos desatualizados
+def test_revalidacao_com_falha_nao_conta_desatualizados(stub_open_meteo):
+    from src.metrics import previsoes_desatualizadas
+    hoje = datetime.today().strftime("%Y-%m-%d")
+    forecast.get_forecast(-3.7, -38.5, hoje, "15:00")
+    antes = previsoes_desatualizadas.amostras()
+    stub_open_meteo.taxa_falha = 1
+    forecast._revalidar([(-3.7, -38.5)], hoje, "weather")
+    limite = time.perf_counter() + 5
+    while forecast._revalidando and time.perf_counter() < limite:
+        time.sleep(0.01)
+    assert not forecast._revalidando
+    assert stub_open_meteo.chamadas["/v1/forecast"] == 2
+    assert previsoes_desatualizadas.amostras() == antes
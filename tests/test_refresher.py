@@ -0,0 +1,104 @@
+import os
+import threading
+from src.dataset import Dataset
+from src.refresher import Atualizador
+
+CABECALHO = "id,Nome,Status,Zona\n"
+
+#Testa que um CSV novo trocado com os.replace é percebido sem reiniciar
+def test_dataset_troca_atomica(tmp_path):
+    csv = tmp_path / "boletim.csv"
+    csv.write_text(CABECALHO + "1,01L - Praia A,Própria para banho,Leste\n", encoding="utf-8")
+    dataset = Dataset(str(csv))
+    assert [p["Nome"] for p in dataset.atual()] == ["01L - Praia A"]
+
+    novo = tmp_path / "boletim.csv.tmp"
+    novo.write_text(CABECALHO + "1,01L - Praia A,Imprópria para banho,Leste\n2,12C - Praia B,Própria para banho,Centro\n", encoding="utf-8")
+    os.replace(novo, csv)
+    assert [p["Status"] for p in dataset.atual()] == ["Imprópria para banho", "Própria para banho"]
+
+#Testa que um CSV inválido não derruba os dados já carregados
+def test_dataset_mantem_ultimo_valido(tmp_path):
+    csv = tmp_path / "boletim.csv"
+    csv.write_text(CABECALHO + "1,01L - Praia A,Própria para banho,Leste\n", encoding="utf-8")
+    chamadas = []
+
+    def loader(caminho):
+        chamadas.append(caminho)
+        if len(chamadas) > 1:
+            raise ValueError("CSV corrompido")
+        return [{"id": 1}]
+
+    dataset = Dataset(str(csv), loader=loader)
+    csv.write_text(CABECALHO + "lixo\n", encoding="utf-8")
+    os.utime(csv, ns=(0, 1))
+    assert dataset.atual() == [{"id": 1}]
+
+#Testa que, com vários atualizadores disputando, o scraper roda uma única vez por intervalo
+def test_atualizador_execucao_unica(tmp_path):
+    execucoes = []
+    liberar = threading.Event()
+
+    def tarefa():
+        execucoes.append(1)
+        liberar.wait(1)
+
+    kwargs = dict(intervalo=3600, lock_file=str(tmp_path / "lock"), stamp_file=str(tmp_path / "stamp"))
+    atualizadores = [Atualizador(tarefa, **kwargs) for _ in range(4)]
+    threads = [threading.Thread(target=a.executar_se_necessario) for a in atualizadores]
+    for t in threads:
+        t.start()
+    liberar.set()
+    for t in threads:
+        t.join()
+    assert len(execucoes) == 1
+    assert not atualizadores[0].executar_se_necessario()
+
+#Testa que uma falha ao abrir o arquivo da trava não deixa a trava presa para as próximas tentativas
+def test_trava_sobrevive_a_erro_ao_abrir(tmp_path):
+    from src.refresher import TravaEntreProcessos
+    trava = TravaEntreProcessos(str(tmp_path / "inexistente" / "scraper.lock"))
+    assert trava.adquirir() is False
+    trava.caminho = str(tmp_path / "scraper.lock")
+    assert trava.adquirir() is True
+    trava.liberar()
+
+#Testa que a tarefa periódica inicia uma única thread por processo e para quando pedido
+def test_tarefa_periodica_uma_thread_por_processo():
+    from src.periodico import TarefaPeriodica
+    passos = threading.Semaphore(0)
+
+    tarefa = TarefaPeriodica("teste-periodica", 0.01, passos.release)
+    tarefa.garantir_iniciado()
+    thread = tarefa._thread
+    tarefa.garantir_iniciado()
+    assert tarefa._thread is thread
+    assert passos.acquire(timeout=1) and passos.acquire(timeout=1)
+    tarefa.parar()
+    thread.join(1)
+    assert not thread.is_alive()
+
+#Testa que um carimbo que não pode ser gravado não derruba a thread nem faz o scraper rodar a cada verificação
+def test_atualizador_sobrevive_a_carimbo_sem_gravacao(tmp_path):
+    execucoes = []
+    atualizador = Atualizador(lambda: execucoes.append(1), intervalo=3600, verificacao=0.01,
+                              lock_file=str(tmp_path / "lock"), stamp_file=str(tmp_path / "inexistente" / "stamp"))
+    assert atualizador.executar_se_necessario()
+    assert not atualizador.executar_se_necessario()
+    assert execucoes == [1]
+
+#Testa que um passo com erro não encerra a thread da tarefa periódica
+def test_tarefa_periodica_sobrevive_a_erro():
+    from src.periodico import TarefaPeriodica
+    passos = threading.Semaphore(0)
+
+    def passo():
+        passos.release()
+        raise OSError("disco somente leitura")
+
+    tarefa = TarefaPeriodica("teste-erro", 0.01, passo)
+    tarefa.garantir_iniciado()
+    assert passos.acquire(timeout=1) and passos.acquire(timeout=1)
+    assert tarefa._thread.is_alive()
+    tarefa.parar()
+    tarefa._thread.join(1)
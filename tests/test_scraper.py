@@ -0,0 +1,101 @@
+import pytest
+from src import scraper
+
+PAGINA = '<a href="/wp-content/boletim-42.pdf">Boletim das Praias de Fortaleza</a>'
+PARSED = {
+    "numero_boletim": "202509181-BOL",
+    "periodo": "15/09/2025 a 21/09/2025",
+    "tipos_amostragem": "Águas procedentes das praias",
+    "linhas": [{"Nome": "01L - P. do Futuro - Praia do Caça e Pesca.", "Status": "P"}],
+}
+
+#simula a página da SEMACE e o PDF, respondendo 304 quando o cliente manda o ETag atual
+@pytest.fixture
+def semace(mocker, tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "ARQUIVO_PDF", str(tmp_path / "boletim.pdf"))
+    monkeypatch.setattr(scraper, "CAMINHO_CSV", str(tmp_path / "boletim.csv"))
+    monkeypatch.setattr(scraper, "ESTADO_FILE", str(tmp_path / "estado.json"))
+    monkeypatch.setattr(scraper, "CACHE_DIR", str(tmp_path / "cache"))
+    site = {"pagina_etag": '"p1"', "pdf": b"%PDF conteudo 1", "pdf_etag": None}
+    parse = mocker.patch.object(scraper, "parse_pdf", return_value=PARSED)
+
+    def fake_get(url, *args, headers=None, **kwargs):
+        headers = headers or {}
+        res = mocker.Mock()
+        if url == scraper.URL_BASE:
+            etag = site["pagina_etag"]
+            res.text = PAGINA
+        else:
+            etag = site["pdf_etag"]
+            res.iter_content.return_value = [site["pdf"]]
+        res.headers = {"ETag": etag} if etag else {}
+        res.status_code = 304 if etag and headers.get("If-None-Match") == etag else 200
+        return res
+
+    mocker.patch("requests.get", side_effect=fake_get)
+    return site, parse
+
+#Testa que a primeira execução processa o PDF e grava o CSV
+def test_run_scraper_boletim_novo(semace):
+    site, parse = semace
+    relatorio = scraper.run_scraper()
+    assert relatorio["alterado"] is True
+    assert parse.call_count == 1
+    assert {"download", "montar_dataframe", "salvar_csv"} <= set(relatorio["etapas"])
+    with open(scraper.CAMINHO_CSV, encoding="utf-8") as f:
+        assert "202509181-BOL" in f.read()
+
+#Testa que, com a página inalterada (304), a execução não baixa nem processa nada
+def test_run_scraper_pagina_nao_modificada(semace):
+    site, parse = semace
+    scraper.run_scraper()
+    relatorio = scraper.run_scraper()
+    assert relatorio["alterado"] is False
+    assert relatorio["motivo"] == "pagina_nao_modificada"
+    assert relatorio["url"] == "https://www.semace.ce.gov.br/wp-content/boletim-42.pdf"
+    assert set(relatorio["etapas"]) == {"download"}
+    assert parse.call_count == 1
+
+#Testa que, sem validadores no PDF, o hash do conteúdo evita reprocessar o mesmo boletim
+def test_run_scraper_hash_inalterado(semace):
+    site, parse = semace
+    scraper.run_scraper()
+    site["pagina_etag"] = '"p2"'
+    relatorio = scraper.run_scraper()
+    assert relatorio["alterado"] is False
+    assert relatorio["motivo"] == "boletim_inalterado"
+    assert parse.call_count == 1
+
+    #conteúdo novo é processado; voltar ao conteúdo antigo reaproveita o cache de parse
+    site["pagina_etag"] = '"p3"'
+    site["pdf"] = b"%PDF conteudo 2"
+    assert scraper.run_scraper()["alterado"] is True
+    site["pagina_etag"] = '"p4"'
+    site["pdf"] = b"%PDF conteudo 1"
+    assert scraper.run_scraper()["alterado"] is True
+    assert parse.call_count == 2
+
+#Testa que o boletim substituído e o boletim em vigor ficam no histórico, mesmo nas execuções sem efeito
+def test_run_scraper_arquiva_boletim_em_vigor(semace, tmp_path, monkeypatch):
+    from src.historico import Historico
+    historico = Historico(str(tmp_path / "h.sqlite3"))
+    monkeypatch.setattr(scraper, "historico", historico)
+    with open(scraper.CAMINHO_CSV, "w", encoding="utf-8") as f:
+        f.write("id,Nome,Status,Periodo,Numero_Boletim\n1,01L - Praia A,Própria para banho,08/09/2025 a 14/09/2025,1-BOL\n")
+    scraper.run_scraper()
+    assert historico.numeros() == ["1-BOL", "202509181-BOL"]
+
+    #banco recriado em outro caminho: a execução sem efeito arquiva o boletim do CSV
+    historico = Historico(str(tmp_path / "novo.sqlite3"))
+    monkeypatch.setattr(scraper, "historico", historico)
+    assert scraper.run_scraper()["motivo"] == "pagina_nao_modificada"
+    assert historico.numeros() == ["202509181-BOL"]
+
+#Testa que os motores camelot e pdfplumber extraem as mesmas linhas do PDF do repositório
+def test_paridade_motores_de_extracao():
+    pytest.importorskip("camelot")
+    arquivo_pdf = scraper.ARQUIVO_PDF
+    camelot = scraper.parse_pdf(arquivo_pdf, "camelot")
+    pdfplumber = scraper.parse_pdf(arquivo_pdf, "pdfplumber")
+    assert len(camelot["linhas"]) == 32
+    assert pdfplumber == camelot
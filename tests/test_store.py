@@ -0,0 +1,97 @@
+from src.dataset import CSV_FILE, carregar_store
+from src.store import PraiaStore
+
+REGISTROS = [
+    {"id": 1, "Nome": "01L - Praia A", "Status": "Própria para banho", "Zona": "Leste", "Periodo": "15/09/2025 a 21/09/2025"},
+    {"id": 2, "Nome": "12C - Praia B", "Status": "Imprópria para banho", "Zona": "Centro", "Periodo": "15/09/2025 a 21/09/2025"},
+    {"id": 3, "Nome": "99X - Praia C", "Status": "Própria para banho", "Zona": "Leste", "Dias_Periodo": "2025-09-22, 2025-09-23"},
+]
+
+#Testa os índices por id, zona, status e código do ponto
+def test_store_indices():
+    store = PraiaStore(REGISTROS)
+    assert store.por_id(2)["Nome"] == "12C - Praia B"
+    assert store.por_id(42) is None
+    assert [p["id"] for p in store.por_zona("Leste")] == [1, 3]
+    assert [p["id"] for p in store.por_status("Própria para banho")] == [1, 3]
+    assert store.por_codigo("12C")["id"] == 2
+    assert store.resumo()[0] == {"id": 1, "nome": "01L - Praia A", "zona": "Leste"}
+
+#Testa coordenadas já convertidas e pontos sem coordenadas conhecidas
+def test_store_coordenadas():
+    store = PraiaStore(REGISTROS)
+    lat, lon = store.coordenadas(store.por_id(1))
+    assert isinstance(lat, float) and round(lat, 2) == -3.77
+    assert store.coordenadas(store.por_id(3)) is None
+
+#Testa que cópias do registro (do histórico ou de uma carga anterior) são reconhecidas pelo código do ponto
+def test_store_registro_copiado():
+    store = PraiaStore(REGISTROS)
+    copia = dict(PraiaStore(REGISTROS).por_id(1))
+    assert store.coordenadas(copia) == store.coordenadas(store.por_id(1))
+    assert store.cobre_data(copia, "2025-09-15")
+    assert store.coordenadas({"Nome": ""}) is None
+
+#Testa o período do boletim como intervalo de datas
+def test_store_cobre_data():
+    store = PraiaStore(REGISTROS)
+    praia = store.por_id(1)
+    assert store.cobre_data(praia, "2025-09-15")
+    assert store.cobre_data(praia, "2025-09-21")
+    assert not store.cobre_data(praia, "2025-09-22")
+    assert not store.cobre_data(praia, "data-invalida")
+    assert store.cobre_data(store.por_id(3), "2025-09-23")
+
+#Testa que o CSV do repositório gera um índice com todas as praias
+def test_store_csv_do_repositorio():
+    store = carregar_store(CSV_FILE)
+    assert len(store) == len({p["id"] for p in store})
+    assert all(store.coordenadas(p) for p in store)
+
+#Testa a consulta das praias mais próximas por limite e por raio, ignorando as sem coordenadas
+def test_store_proximas():
+    store = carregar_store(CSV_FILE)
+    lat, lon = store.coordenadas(store.por_id(5))
+    proximas = store.proximas(lat, lon, limite=3)
+    assert proximas[0][0]["id"] == 5 and proximas[0][1] < 1e-6
+    assert [d for _, d in proximas] == sorted(d for _, d in proximas)
+    todas = store.proximas(lat, lon)
+    assert len(todas) == len(store)
+    assert [p["id"] for p, _ in todas[:3]] == [p["id"] for p, _ in proximas]
+    assert all(d <= 2 for _, d in store.proximas(lat, lon, raio_km=2))
+    assert PraiaStore(REGISTROS[2:]).proximas(lat, lon) == []
+
+#Testa que o snapshot é gravado fora do projeto e reaproveitado sem reler o CSV, decodificando só os registros pedidos
+def test_snapshot_do_csv(tmp_path, monkeypatch):
+    import os, shutil
+    import pytest
+    from src import dataset
+    from src.snapshot import SNAPSHOT_DIR, abrir_snapshot, caminho_do_snapshot
+    csv = tmp_path / "boletim.csv"
+    shutil.copy(CSV_FILE, csv)
+    original = carregar_store(str(csv))
+    caminho = caminho_do_snapshot(str(csv))
+    assert os.path.dirname(caminho) == SNAPSHOT_DIR
+    assert abrir_snapshot(caminho).origem == dataset.versao_do_arquivo(str(csv))
+
+    monkeypatch.setattr(dataset, "carregar_praias", lambda caminho: pytest.fail("o CSV não deveria ser relido"))
+    store = carregar_store(str(csv))
+    assert store.por_id(5) == original.por_id(5)
+    assert sum(r is not None for r in store._registros) == 1
+    assert store.coordenadas(store.por_id(5)) == original.coordenadas(original.por_id(5))
+    assert list(store) == list(original)
+    assert [store.periodo(p) for p in store] == [original.periodo(p) for p in original]
+
+#Testa que um snapshot de outra versão do CSV, ou corrompido, é refeito
+def test_snapshot_desatualizado_e_refeito(tmp_path):
+    from src.snapshot import caminho_do_snapshot
+    csv = tmp_path / "boletim.csv"
+    csv.write_text("id,Nome,Status,Zona\n1,01L - Praia A,Própria para banho,Leste\n", encoding="utf-8")
+    assert carregar_store(str(csv)).por_id(1)["Status"] == "Própria para banho"
+    csv.write_text("id,Nome,Status,Zona\n1,01L - Praia A,Imprópria para banho,Leste\n", encoding="utf-8")
+    assert carregar_store(str(csv)).por_id(1)["Status"] == "Imprópria para banho"
+    with open(caminho_do_snapshot(str(csv)), "r+b") as f:
+        f.write(b"lixo")
+    store = carregar_store(str(csv))
+    assert [p["id"] for p in store.por_status("Imprópria para banho")] == [1]
+    assert store.coordenadas(store.por_id(1)) is not None